@@ -0,0 +1,58 @@
+import json
+import math
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.config import DATABASE_URL
+
+
+def make_sessionmaker(database_url: str | None = None):
+    engine = create_async_engine(database_url or DATABASE_URL)
+    return engine, async_sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def percentile(sorted_values, q: float):
+    """Перцентиль по методу nearest-rank для уже отсортированного списка"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms):
+    values = sorted(latencies_ms)
+    if not values:
+        return {"calls": 0}
+
+    return {
+        "calls": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+    }
+
+
+def save_report(report: dict, path: str | None):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    print(text)
+
+
+def compare_reports(current: dict, baseline_path: str):
+    """Печатает отношение p50/p95/p99 к сохранённому прогону (>1 — стало медленнее)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name}: no baseline")
+            continue
+        ratios = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if stats.get(key) and base.get(key):
+                ratios.append(f"{key[:-3]} x{stats[key] / base[key]:.2f}")
+        print(f"{name}: " + ", ".join(ratios))
@@ -0,0 +1,159 @@
+"""
+Проверка планов горячих запросов на заполненной базе (см. benchmarks.synthetic).
+
+    python -m benchmarks.explain
+    python -m benchmarks.explain --only feed comments --min-rows 50000
+
+Каждый случай вызывает настоящие функции db и сервисов рекомендаций,
+перехватывает выполненные SELECT и прогоняет их через EXPLAIN (без ANALYZE).
+Проверка падает (код выхода 1), если какой-то запрос делает Seq Scan
+по таблице, в которой по статистике не меньше --min-rows строк.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import event, text
+
+from src.database.db import get_comments_page, get_community_marker, get_community_posts, get_posts_page
+from src.services.post_recommendations.like_post_service import LikePostRecommendationService
+from src.services.post_recommendations.tag_post_service import TagPostRecommendationService
+from src.services.user_recommendations.graph_user_service import GraphService
+from src.services.user_recommendations.like_user_service import LikeRecommendationService
+from src.services.user_recommendations.tag_user_service import TagUserRecommendationService
+
+from .common import make_sessionmaker
+
+
+async def _community(session, ctx):
+    await get_community_posts(session, ctx["community_id"])
+    await get_community_marker(session, ctx["community_id"], ctx["user_id"])
+
+
+CASES = {
+    "feed": lambda s, ctx: get_posts_page(s),
+    "community": _community,
+    "comments": lambda s, ctx: get_comments_page(s, ctx["post_id"]),
+    "like_posts": lambda s, ctx: LikePostRecommendationService(s).recommend_posts(ctx["user_id"]),
+    "tag_posts": lambda s, ctx: TagPostRecommendationService(s).recommend_posts(ctx["user_id"]),
+    "friends_of_friends": lambda s, ctx: GraphService(s).get_friends_of_friends(ctx["user_id"]),
+    "like_users": lambda s, ctx: LikeRecommendationService(s).recommend_by_likes(ctx["user_id"]),
+    "tag_users": lambda s, ctx: TagUserRecommendationService(s).recommend_by_tags(ctx["user_id"]),
+}
+
+
+class StatementRecorder:
+    """Запоминает SELECT-запросы, выполненные через engine, пока recording = True"""
+
+    def __init__(self, engine):
+        self.recording = False
+        self.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.recording and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append((statement, parameters))
+
+
+async def _context(session, user_id: int | None):
+    # Самое большое сообщество, самый обсуждаемый пост и пользователь с медианным числом лайков:
+    # планы для типичного пользователя, а не для крайнего случая
+    result = await session.execute(text("""
+        SELECT community_id FROM posts WHERE community_id IS NOT NULL
+        GROUP BY community_id ORDER BY COUNT(*) DESC, community_id LIMIT 1
+    """))
+    community_id = result.scalar()
+    result = await session.execute(text("SELECT post_id FROM posts ORDER BY comments_count DESC, post_id LIMIT 1"))
+    post_id = result.scalar()
+    if user_id is None:
+        result = await session.execute(text("""
+            SELECT user_id FROM (SELECT user_id, COUNT(*) AS n FROM likes GROUP BY user_id) t
+            ORDER BY n, user_id
+            OFFSET (SELECT COUNT(DISTINCT user_id) FROM likes) / 2
+            LIMIT 1
+        """))
+        user_id = result.scalar()
+
+    if community_id is None or post_id is None or user_id is None:
+        raise SystemExit("Database is empty, run python -m benchmarks.synthetic first")
+    return {"community_id": community_id, "post_id": post_id, "user_id": user_id}
+
+
+def _scans(plan):
+    node_type = plan["Node Type"]
+    if "Scan" in node_type and "Relation Name" in plan:
+        yield node_type, plan["Relation Name"], plan.get("Index Name")
+    for child in plan.get("Plans", ()):
+        yield from _scans(child)
+
+
+async def _explain(session, statement, parameters):
+    connection = await session.connection()
+    result = await connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(_scans(plan[0]["Plan"]))
+
+
+async def _table_sizes(session):
+    result = await session.execute(text("""
+        SELECT c.relname, c.reltuples::bigint
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind = 'r' AND n.nspname = current_schema()
+    """))
+    return dict(result.all())
+
+
+async def check_case(session, recorder, name, ctx, sizes, min_rows: int):
+    recorder.statements = []
+    recorder.recording = True
+    try:
+        await CASES[name](session, ctx)
+    finally:
+        recorder.recording = False
+    await session.rollback()
+
+    failures = 0
+    print(f"{name}: {len(recorder.statements)} statements")
+    for statement, parameters in recorder.statements:
+        for node_type, relation, index in await _explain(session, statement, parameters):
+            rows = sizes.get(relation, 0)
+            bad = node_type == "Seq Scan" and rows >= min_rows
+            failures += bad
+            target = f"{relation} ({rows} rows)" + (f" using {index}" if index else "")
+            print(f"  {'FAIL' if bad else 'ok  '} {node_type} on {target}")
+    await session.rollback()
+
+    return failures
+
+
+async def main(args):
+    engine, sessionmaker = make_sessionmaker(args.database_url)
+    recorder = StatementRecorder(engine)
+
+    failures = 0
+    async with sessionmaker() as session:
+        ctx = await _context(session, args.user_id)
+        sizes = await _table_sizes(session)
+        print(f"community {ctx['community_id']}, post {ctx['post_id']}, user {ctx['user_id']}")
+        for name in args.only or list(CASES):
+            failures += await check_case(session, recorder, name, ctx, sizes, args.min_rows)
+    await engine.dispose()
+
+    if failures:
+        print(f"{failures} sequential scans on large tables")
+        sys.exit(1)
+    print("All hot queries use indexes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that hot queries are planned with index scans")
+    parser.add_argument("--only", nargs="+", choices=CASES)
+    parser.add_argument("--min-rows", type=int, default=10_000,
+                        help="fail on a Seq Scan over a table with at least this many rows")
+    parser.add_argument("--user-id", type=int, help="user for recommendation queries, default: median by likes")
+    parser.add_argument("--database-url")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,230 @@
+"""
+Нагрузочный тест API без docker-compose: приложение src.app.app вызывается
+в том же процессе через ASGI-транспорт httpx или через настоящий сокет uvicorn.
+
+    python -m benchmarks.http_load --concurrency 32 --duration 30
+    python -m benchmarks.http_load --uvicorn --mix posts=70,token=30
+
+База берётся из DATABASE_URL и должна быть заполнена benchmarks.synthetic:
+для /api/token и авторизованных запросов нужны пользователи bench_user_N с паролем BENCH_PASSWORD.
+"""
+import argparse
+import asyncio
+import random
+import socket
+import time
+from collections import defaultdict
+
+import httpx
+import uvicorn
+from sqlalchemy import text
+
+from src.app import app
+
+from .common import compare_reports, make_sessionmaker, save_report, summarize
+from .synthetic import BENCH_PASSWORD
+
+
+DEFAULT_MIX = "posts=50,profile=25,community=15,token=10"
+
+
+def parse_mix(value: str):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route {name!r}, expected one of {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Случайные, но воспроизводимые по seed параметры запросов"""
+
+    def __init__(self, user_ids, community_ids, login_users, tokens, seed: int):
+        self.user_ids = user_ids
+        self.community_ids = community_ids
+        self.login_users = login_users
+        self.tokens = tokens
+        self.seed = seed
+
+    def headers(self, rng: random.Random):
+        # Половина запросов — от залогиненных пользователей
+        if self.tokens and rng.random() < 0.5:
+            return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+        return {}
+
+
+async def _posts(client, workload, rng, state):
+    params = {"limit": 20}
+    # Листаем ленту дальше примерно в половине случаев
+    if state.get("cursor") and rng.random() < 0.5:
+        params["after"] = state["cursor"]
+    response = await client.get("/api/posts", params=params, headers=workload.headers(rng))
+    if response.status_code == 200:
+        state["cursor"] = response.json().get("next_cursor")
+    return response
+
+
+async def _profile(client, workload, rng, state):
+    user_id = rng.choice(workload.user_ids)
+    return await client.get(f"/api/profile/{user_id}", headers=workload.headers(rng))
+
+
+async def _community(client, workload, rng, state):
+    community_id = rng.choice(workload.community_ids)
+    return await client.get(f"/api/communities/{community_id}", headers=workload.headers(rng))
+
+
+async def _token(client, workload, rng, state):
+    username = rng.choice(workload.login_users)
+    return await client.post("/api/token", data={"username": username, "password": BENCH_PASSWORD})
+
+
+ROUTES = {
+    "posts": _posts,
+    "profile": _profile,
+    "community": _community,
+    "token": _token,
+}
+
+
+async def load_workload(client, login_count: int, seed: int):
+    engine, sessionmaker = make_sessionmaker()
+    async with sessionmaker() as session:
+        result = await session.execute(text('SELECT user_id FROM "user" ORDER BY user_id'))
+        user_ids = [r[0] for r in result]
+        result = await session.execute(text("SELECT community_id FROM communities ORDER BY community_id"))
+        community_ids = [r[0] for r in result]
+        result = await session.execute(
+            text("SELECT username FROM \"user\" WHERE username LIKE 'bench_user_%' ORDER BY user_id LIMIT :n"),
+            {"n": login_count}
+        )
+        login_users = [r[0] for r in result]
+    await engine.dispose()
+
+    if not user_ids or not community_ids:
+        raise SystemExit("Database is empty, run python -m benchmarks.synthetic first")
+
+    tokens = []
+    for username in login_users:
+        response = await client.post("/api/token", data={"username": username, "password": BENCH_PASSWORD})
+        if response.status_code == 200:
+            tokens.append(response.json()["access_token"])
+
+    return Workload(user_ids, community_ids, login_users, tokens, seed)
+
+
+async def _worker(client, workload, mix, worker_id: int, deadline: float, samples, errors):
+    rng = random.Random(workload.seed * 1000 + worker_id)
+    names = list(mix)
+    weights = list(mix.values())
+    state = {}
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights=weights)[0]
+        start = time.perf_counter()
+        try:
+            response = await ROUTES[name](client, workload, rng, state)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+
+        samples[name].append(elapsed)
+        if not ok:
+            errors[name] += 1
+
+
+async def run_load(client, workload, mix, concurrency: int, duration: float, warmup: float):
+    if warmup:
+        await asyncio.gather(*(
+            _worker(client, workload, mix, i, time.perf_counter() + warmup, defaultdict(list), defaultdict(int))
+            for i in range(concurrency)
+        ))
+
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(client, workload, mix, i, started + duration, samples, errors)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in mix:
+        stats = summarize(samples[name])
+        stats["rps"] = round(len(samples[name]) / elapsed, 1)
+        stats["errors"] = errors[name]
+        results[name] = stats
+    total = sum(len(v) for v in samples.values())
+
+    return results, round(total / elapsed, 1)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run_asgi(args, mix):
+    # ASGITransport не запускает lifespan сам, поэтому поднимаем его вручную
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            workload = await load_workload(client, args.login_users, args.seed)
+            return await run_load(client, workload, mix, args.concurrency, args.duration, args.warmup)
+
+
+async def _run_uvicorn(args, mix):
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve.done():
+            serve.result()
+        await asyncio.sleep(0.05)
+
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+            workload = await load_workload(client, args.login_users, args.seed)
+            return await run_load(client, workload, mix, args.concurrency, args.duration, args.warmup)
+    finally:
+        server.should_exit = True
+        await serve
+
+
+async def main(args):
+    mix = args.mix
+    runner = _run_uvicorn if args.uvicorn else _run_asgi
+    results, total_rps = await runner(args, mix)
+
+    report = {
+        "transport": "uvicorn" if args.uvicorn else "asgi",
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mix": mix,
+        "total_rps": total_rps,
+        "results": results,
+    }
+    save_report(report, args.output)
+    if args.compare:
+        compare_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API routes in-process")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured load first")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"route weights, default {DEFAULT_MIX}")
+    parser.add_argument("--login-users", type=int, default=20, help="how many bench users to log in")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uvicorn", action="store_true", help="go through a real socket instead of ASGI")
+    parser.add_argument("--output", help="save the JSON report to this file")
+    parser.add_argument("--compare", help="previous JSON report to compare with")
+
+    asyncio.run(main(parser.parse_args()))
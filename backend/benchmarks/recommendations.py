@@ -0,0 +1,126 @@
+"""
+Бенчмарк сервисов рекомендаций на заполненной базе (см. benchmarks.synthetic).
+
+    python -m benchmarks.recommendations --users 200 --output after.json --compare before.json
+
+Для каждого сервиса замеряются p50/p95/p99 задержки на выборке пользователей
+и число строк, прочитанных Postgres (по pg_stat_user_tables), в среднем на вызов.
+Кэш рекомендаций отключён, чтобы мерить сами запросы.
+Сравнить SQL- и Python-агрегацию можно, запустив с RECOMMENDATION_SQL_AGGREGATION=0.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from src.config import RECOMMENDATION_SQL_AGGREGATION
+from src.services.recommendation_cache import RecommendationCache
+from src.services.post_recommendations.co_like_index import co_like_index
+from src.services.post_recommendations.like_post_service import LikePostRecommendationService
+from src.services.post_recommendations.tag_post_service import TagPostRecommendationService
+from src.services.post_recommendations.smart_post_recommendation_service import SmartPostRecommendationService
+from src.services.user_recommendations.friendship_graph import friendship_graph
+from src.services.user_recommendations.graph_user_service import GraphService
+from src.services.user_recommendations.combined_user_service import CombinedUserRecommendationService
+from src.services.user_recommendations.smart_recommendation_service import SmartRecommendationService
+
+from .common import compare_reports, make_sessionmaker, save_report, summarize
+
+
+def _no_cache():
+    # ttl = 0: любая запись сразу считается устаревшей
+    return RecommendationCache(1, 0)
+
+
+SERVICES = {
+    "like_posts": lambda s, uid: LikePostRecommendationService(s).recommend_posts(uid),
+    "tag_posts": lambda s, uid: TagPostRecommendationService(s).recommend_posts(uid),
+    "smart_posts": lambda s, uid: SmartPostRecommendationService(s, cache=_no_cache()).get_all_ordered(uid),
+    "friends_of_friends": lambda s, uid: GraphService(s).get_friends_of_friends(uid),
+    "combined_users": lambda s, uid: CombinedUserRecommendationService(s).recommend_users(uid),
+    "smart_users": lambda s, uid: SmartRecommendationService(s, cache=_no_cache()).get_top(uid),
+}
+
+
+async def _rows_read(session):
+    """Сколько строк Postgres прочитал из пользовательских таблиц с момента сброса статистики"""
+    await session.execute(text("SELECT pg_stat_force_next_flush()"))
+    await session.commit()
+    await session.execute(text("SELECT pg_stat_clear_snapshot()"))
+    result = await session.execute(text("""
+        SELECT COALESCE(SUM(seq_tup_read + COALESCE(idx_tup_fetch, 0)), 0)
+        FROM pg_stat_user_tables
+    """))
+    rows = result.scalar()
+    await session.commit()
+    return int(rows)
+
+
+async def _sample_users(session, count: int, seed: int):
+    result = await session.execute(text("SELECT user_id FROM likes GROUP BY user_id"))
+    user_ids = sorted(r[0] for r in result)
+    rng = random.Random(seed)
+    return rng.sample(user_ids, min(count, len(user_ids)))
+
+
+async def run_benchmark(sessionmaker, user_ids, names):
+    results = {}
+    for name in names:
+        call = SERVICES[name]
+        latencies = []
+        async with sessionmaker() as session:
+            before = await _rows_read(session)
+            for user_id in user_ids:
+                start = time.perf_counter()
+                await call(session, user_id)
+                latencies.append((time.perf_counter() - start) * 1000)
+                await session.rollback()
+            after = await _rows_read(session)
+
+        stats = summarize(latencies)
+        stats["rows_read_per_call"] = round((after - before) / len(user_ids), 1) if user_ids else 0
+        results[name] = stats
+        print(f"{name}: p50 {stats.get('p50_ms')} ms, p99 {stats.get('p99_ms')} ms")
+
+    return results
+
+
+async def main(args):
+    engine, sessionmaker = make_sessionmaker(args.database_url)
+
+    async with sessionmaker() as session:
+        user_ids = await _sample_users(session, args.users, args.seed)
+        if args.with_indexes:
+            await co_like_index.rebuild(session)
+            await friendship_graph.load(session)
+
+    names = args.only or list(SERVICES)
+    results = await run_benchmark(sessionmaker, user_ids, names)
+    await engine.dispose()
+
+    report = {
+        "users": len(user_ids),
+        "seed": args.seed,
+        "with_indexes": args.with_indexes,
+        "sql_aggregation": RECOMMENDATION_SQL_AGGREGATION,
+        "results": results,
+    }
+    save_report(report, args.output)
+    if args.compare:
+        compare_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommendation services")
+    parser.add_argument("--users", type=int, default=200, help="how many sampled users to query")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=SERVICES)
+    parser.add_argument("--with-indexes", action="store_true",
+                        help="load the in-memory co-like index and friendship graph first")
+    parser.add_argument("--output", help="save the JSON report to this file")
+    parser.add_argument("--compare", help="previous JSON report to compare with")
+    parser.add_argument("--database-url")
+
+    asyncio.run(main(parser.parse_args()))
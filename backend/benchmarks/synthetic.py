@@ -0,0 +1,210 @@
+"""
+Генератор воспроизводимого синтетического датасета социальной сети.
+
+    python -m benchmarks.synthetic --scale 10k --reset
+
+Степени дружбы и число лайков распределены по Парето, популярность
+пользователей и постов — по Ципфу, так что появляются «звёзды» и вирусные посты.
+Одинаковые --scale и --seed всегда дают одинаковые данные.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from datetime import datetime
+
+from sqlalchemy import text
+
+from src.database.migrations import migrate
+from src.database.models.user_data import DEFAULT_AVATAR_URL
+from src.utils import password_hasher
+
+from .common import make_sessionmaker
+
+
+SCALES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+BENCH_PASSWORD = "bench-password"
+
+TABLES = [
+    '"user"', "user_data", "communities", "user_community", "posts",
+    "tags", "post_tags", "likes", "friendship", "comments",
+    # Не генерируются, но ссылаются на id пользователей и должны очищаться вместе с ними
+    "recommendations", "messages", "conversations",
+]
+
+
+def _zipf_cum_weights(n: int, exponent: float):
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _pareto(rng: random.Random, mean: float, cap: int):
+    # У распределения Парето с alpha = 2 среднее равно 2 * xm
+    return min(int(rng.paretovariate(2.0) * mean / 2), cap)
+
+
+def _pick(rng: random.Random, cum_weights, k: int):
+    return set(rng.choices(range(1, len(cum_weights) + 1), cum_weights=cum_weights, k=k))
+
+
+class SyntheticDataset:
+    def __init__(self, users: int, seed: int = 42, login_users: int = 100, chunk_size: int = 50_000):
+        self.users = users
+        self.posts = users
+        self.communities = max(users // 1000, 5)
+        self.tags = 200
+        self.seed = seed
+        self.login_users = min(login_users, users)
+        self.chunk_size = chunk_size
+
+    async def _copy(self, session, table: str, columns, rows):
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table.strip('"'), columns=columns, records=rows)
+
+    async def _copy_stream(self, session, table: str, columns, rows):
+        for chunk in itertools.batched(rows, self.chunk_size):
+            await self._copy(session, table, columns, chunk)
+
+    async def reset(self, session, force: bool):
+        result = await session.execute(text('SELECT EXISTS (SELECT 1 FROM "user")'))
+        if result.scalar() and not force:
+            raise SystemExit("Database is not empty, pass --reset to wipe it")
+        await session.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY"))
+
+    def _users(self, rng: random.Random):
+        # Настоящий bcrypt только у первых login_users: их используют нагрузочные тесты /api/token
+        for user_id in range(1, self.users + 1):
+            if user_id <= self.login_users:
+                hashed = password_hasher.context.hash(BENCH_PASSWORD)
+            else:
+                hashed = f"!bench-{user_id}"
+            yield user_id, f"bench_user_{user_id}", hashed
+
+    def _user_data(self, rng: random.Random):
+        for user_id in range(1, self.users + 1):
+            yield (
+                user_id, f"Имя{user_id}", f"Фамилия{user_id}",
+                datetime(1970 + rng.randrange(40), 1 + rng.randrange(12), 1 + rng.randrange(28)),
+                "Не указан", DEFAULT_AVATAR_URL, "Пусто", "Пусто", "Пусто", True,
+            )
+
+    def _posts(self, rng: random.Random):
+        # Каждый пятый пост — от сообщества
+        for post_id in range(1, self.posts + 1):
+            if rng.random() < 0.2:
+                author, community_id = None, rng.randint(1, self.communities)
+            else:
+                author, community_id = rng.randint(1, self.users), None
+            yield post_id, author, community_id, f"Пост {post_id}", f"Текст поста {post_id}", None, 0, 0
+
+    def _post_tags(self, rng: random.Random, tag_weights):
+        for post_id in range(1, self.posts + 1):
+            for tag_id in _pick(rng, tag_weights, rng.randint(1, 3)):
+                yield post_id, tag_id
+
+    def _edges(self, rng: random.Random, target_weights, mean: float, cap: int, allow_self: bool = True):
+        for source in range(1, self.users + 1):
+            degree = _pareto(rng, mean, cap)
+            for target in _pick(rng, target_weights, degree):
+                if allow_self or target != source:
+                    yield source, target
+
+    def _subscriptions(self, rng: random.Random, community_weights):
+        for user_id in range(1, self.users + 1):
+            for community_id in _pick(rng, community_weights, rng.randint(0, 6)):
+                yield user_id, community_id
+
+    def _comments(self, rng: random.Random, post_weights):
+        comment_id = 0
+        for _ in range(self.posts * 2):
+            comment_id += 1
+            post_id = rng.choices(range(1, self.posts + 1), cum_weights=post_weights)[0]
+            yield comment_id, post_id, rng.randint(1, self.users), f"Комментарий {comment_id}"
+
+    async def generate(self, session, force: bool = False):
+        rng = random.Random(self.seed)
+        user_weights = _zipf_cum_weights(self.users, 0.8)
+        post_weights = _zipf_cum_weights(self.posts, 0.9)
+        tag_weights = _zipf_cum_weights(self.tags, 1.0)
+        community_weights = _zipf_cum_weights(self.communities, 1.0)
+
+        await self.reset(session, force)
+
+        await self._copy_stream(session, "user", ["user_id", "username", "hashed_password"], self._users(rng))
+        await self._copy_stream(
+            session, "user_data",
+            ["user_id", "first_name", "last_name", "birthday", "gender",
+             "avatar_url", "bio", "city", "country", "is_active"],
+            self._user_data(rng)
+        )
+        await self._copy(
+            session, "communities", ["community_id", "name", "description", "avatar"],
+            [(cid, f"Сообщество {cid}", f"Описание {cid}", None) for cid in range(1, self.communities + 1)]
+        )
+        await self._copy(session, "tags", ["tag_id", "name"], [(tid, f"tag{tid}") for tid in range(1, self.tags + 1)])
+        await self._copy_stream(
+            session, "posts",
+            ["post_id", "user_id", "community_id", "title", "content", "picture", "likes_count", "comments_count"],
+            self._posts(rng)
+        )
+        await self._copy_stream(session, "post_tags", ["post_id", "tag_id"], self._post_tags(rng, tag_weights))
+        await self._copy_stream(
+            session, "friendship", ["user_id", "friend_id"],
+            self._edges(rng, user_weights, mean=10, cap=1000, allow_self=False)
+        )
+        await self._copy_stream(session, "likes", ["user_id", "post_id"], self._edges(rng, post_weights, mean=10, cap=2000))
+        await self._copy_stream(
+            session, "user_community", ["user_id", "community_id"], self._subscriptions(rng, community_weights)
+        )
+        await self._copy_stream(
+            session, "comments", ["comment_id", "post_id", "user_id", "content"], self._comments(rng, post_weights)
+        )
+
+        await session.execute(text("""
+            UPDATE posts p SET likes_count = l.cnt
+            FROM (SELECT post_id, COUNT(*) AS cnt FROM likes GROUP BY post_id) l
+            WHERE p.post_id = l.post_id
+        """))
+        await session.execute(text("""
+            UPDATE posts p SET comments_count = c.cnt
+            FROM (SELECT post_id, COUNT(*) AS cnt FROM comments GROUP BY post_id) c
+            WHERE p.post_id = c.post_id
+        """))
+        for table, column in (('"user"', "user_id"), ("posts", "post_id"), ("communities", "community_id"),
+                              ("tags", "tag_id"), ("comments", "comment_id")):
+            await session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), (SELECT MAX({column}) FROM {table}))"
+            ))
+        await session.commit()
+
+
+async def main(args):
+    engine, sessionmaker = make_sessionmaker(args.database_url)
+    async with engine.begin() as conn:
+        await migrate(conn)
+
+    dataset = SyntheticDataset(SCALES[args.scale], seed=args.seed, login_users=args.login_users)
+    async with sessionmaker() as session:
+        await dataset.generate(session, force=args.reset)
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+    print(f"Generated {args.scale} dataset (seed={args.seed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the database with a synthetic social graph")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--login-users", type=int, default=100)
+    parser.add_argument("--reset", action="store_true", help="wipe existing data first")
+    parser.add_argument("--database-url")
+
+    asyncio.run(main(parser.parse_args()))
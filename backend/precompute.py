@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+
+from src.database.db import SessionLocal, init_db
+from src.services.batch_recommendations import BatchRecommendationJob
+
+
+async def main(args):
+    await init_db()
+    async with SessionLocal() as session:
+        job = BatchRecommendationJob(
+            session,
+            post_top_n=args.post_top_n,
+            user_top_n=args.user_top_n,
+            chunk_size=args.chunk_size
+        )
+        posts, users = await job.run()
+    print(f"Saved {posts} post and {users} user recommendations")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute recommendations for all users")
+    parser.add_argument("--post-top-n", type=int, default=10)
+    parser.add_argument("--user-top-n", type=int, default=15)
+    parser.add_argument("--chunk-size", type=int, default=2048)
+
+    asyncio.run(main(parser.parse_args()))
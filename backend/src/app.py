@@ -1,10 +1,71 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from .database.db import SessionLocal, init_db, friendship_listeners, message_listeners, user_id_cache
+from .database.like_buffer import like_buffer
+from .metrics import Gauge, finish_request, register_cache, registry, start_request
+from .services.post_recommendations.co_like_index import co_like_index
+from .services.message_hub import message_hub
+from .services.recommendation_cache import recommendation_cache
+from .services.user_recommendations.friendship_graph import friendship_graph
 from .routes import include_routers
+from .utils import password_hasher, token_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    async with SessionLocal() as session:
+        await friendship_graph.load(session)
+    like_buffer.add_listener(co_like_index.on_likes_changed)
+    like_buffer.add_listener(recommendation_cache.on_likes_changed)
+    friendship_listeners.append(friendship_graph.on_friendship_changed)
+    friendship_listeners.append(recommendation_cache.on_friendship_changed)
+    message_listeners.append(message_hub.on_message_created)
+    like_buffer.start()
+    # Индекс совместных лайков строится самоджойном всей likes: не задерживаем старт,
+    # пока он не готов, LikePostRecommendationService считает в SQL
+    co_like_build = asyncio.create_task(co_like_index.rebuild_in_background(SessionLocal))
+    yield
+    co_like_build.cancel()
+    with suppress(asyncio.CancelledError):
+        await co_like_build
+    await like_buffer.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+register_cache("user_id_cache", user_id_cache)
+register_cache("token_cache", token_cache)
+register_cache("recommendation_cache", recommendation_cache)
+registry.register(Gauge("password_hash_in_flight", "bcrypt jobs running or queued", lambda: password_hasher.in_flight))
+registry.register(Gauge("password_hash_queue_depth", "bcrypt jobs waiting for a worker", lambda: password_hasher.queue_depth))
+registry.register(Gauge("realtime_connections", "Open message WebSocket connections", lambda: message_hub.connections))
+registry.register(Gauge(
+    "realtime_overflows_total", "WebSocket connections dropped for a full send queue",
+    lambda: message_hub.overflows, kind="counter"
+))
 
 
-app = FastAPI()
+@app.middleware("http")
+async def collect_metrics(request: Request, call_next):
+    stats = start_request()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Шаблон пути, а не сам путь, чтобы не плодить метки на каждый id
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        if path != "/metrics":
+            finish_request(stats, request.method, path, status, time.perf_counter() - start)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,4 +79,4 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-include_routers(app)
\ No newline at end of file
+include_routers(app)
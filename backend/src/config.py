@@ -8,3 +8,21 @@ DB_HOST: str = os.getenv("DB_HOST", "")
 DB_PORT: str = os.getenv("DB_PORT", "")
 POSTGRES_DB: str = os.getenv("POSTGRES_DB", "")
 DATABASE_URL: str = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}"
+
+PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+LIKE_FLUSH_INTERVAL: float = float(os.getenv("LIKE_FLUSH_INTERVAL", "0.5"))
+LIKE_FLUSH_MAX_BATCH: int = int(os.getenv("LIKE_FLUSH_MAX_BATCH", "1000"))
+CO_LIKE_NEIGHBORS: int = int(os.getenv("CO_LIKE_NEIGHBORS", "50"))
+RECOMMENDATION_CACHE_SIZE: int = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+RECOMMENDATION_CACHE_TTL: int = int(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+# Считать оценки рекомендаций через GROUP BY в Postgres (иначе Counter в Python)
+RECOMMENDATION_SQL_AGGREGATION: bool = os.getenv("RECOMMENDATION_SQL_AGGREGATION", "1") == "1"
+FRIENDSHIP_GRAPH_COMPACT_THRESHOLD: int = int(os.getenv("FRIENDSHIP_GRAPH_COMPACT_THRESHOLD", "10000"))
+# Предупреждать о возможном N+1, если запрос выполнил больше SQL-запросов (0 — выключено)
+QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", "20"))
+SQL_ECHO: bool = os.getenv("SQL_ECHO", "0") == "1"
+# Сколько событий может ждать отправки в одном WebSocket-соединении
+REALTIME_QUEUE_SIZE: int = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
@@ -1,7 +1,8 @@
+import logging
 from datetime import datetime
-from passlib.context import CryptContext
 
-from sqlalchemy import select, update, delete, desc
+from sqlalchemy import select, update, delete, desc, func, text
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio.engine import create_async_engine
 from sqlalchemy.ext.asyncio.session import async_sessionmaker, AsyncSession
 from sqlalchemy.exc import IntegrityError
@@ -9,31 +10,47 @@ from sqlalchemy.exc import IntegrityError
 from fastapi.exceptions import HTTPException
 
 
-from ..config import DATABASE_URL
+from ..config import DATABASE_URL, USER_CACHE_SIZE, SQL_ECHO
+from ..cache import LRUCache
+from ..metrics import TimedQueuePool, instrument_engine
+from ..utils import password_hasher
 from .models.base import Base
 from .models.posts import Post
 from .models.user import User
 from .models.friendship import Friendship
-from .models.user_data import UserData
+from .models.user_data import UserData, DEFAULT_AVATAR_URL
 from .models.messages import Message
+from .models.conversations import Conversation
 from .models.comments import Comment
 from .models.communities import Community
 from .models.user_community import UserCommunity
+from .models.likes import Like
+from .models.tags import Tag
+from .models.post_tags import PostTag
+from .models.recommendations import Recommendation
+from .loaders import RelatedLoader
+from .migrations import migrate
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 engine = create_async_engine(
-    url=DATABASE_URL, 
-    echo=True, 
-    echo_pool=True,   
+    url=DATABASE_URL,
+    echo=SQL_ECHO,
+    poolclass=TimedQueuePool,
 )
+instrument_engine(engine)
 
 SessionLocal = async_sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
-async def get_db():
+logger = logging.getLogger(__name__)
+
+# username -> user_id, сбрасывается при изменении пользователя
+user_id_cache = LRUCache(maxsize=USER_CACHE_SIZE)
+
+async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await migrate(conn)
+
+async def get_db():
     async with SessionLocal() as session:
         try:
             yield session
@@ -45,15 +62,15 @@ async def get_db():
 
 # Auth
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+async def get_password_hash(password: str):
+    return await password_hasher.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    return await password_hasher.verify(plain_password, hashed_password)
 
 async def authenticate_user(session: AsyncSession, username: str, password: str):
     user = await get_by_username(session, username)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password(password, user.hashed_password):
         raise HTTPException(status_code=404, detail=f"{username} is not found or incorrect password")
     return user 
 
@@ -64,8 +81,19 @@ async def get_by_username(session: AsyncSession, username: str):
 
     return user
 
+async def get_user_id_by_username(session: AsyncSession, username: str):
+    user_id = user_id_cache.get(username)
+    if user_id is None:
+        user = await get_by_username(session, username)
+        if not user:
+            return None
+        user_id = user.user_id
+        user_id_cache.set(username, user_id)
+
+    return user_id
+
 async def create_user(session: AsyncSession, username: str, password: str):
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password)
     user = User(username=username, hashed_password=hashed_password)
     try:
         session.add(user)
@@ -75,11 +103,53 @@ async def create_user(session: AsyncSession, username: str, password: str):
         session.rollback()
         raise HTTPException(status_code=404, detail=f"User with username {username} already exists")
 
+    user_id_cache.pop(username)
     return user
 
 # Posts
 
-async def get_all_posts(session: AsyncSession):
+def _post_to_dict(row, loader: RelatedLoader):
+    if row.community_id:
+        # Пост от сообщества
+        community = loader.community(row.community_id)
+        return {
+            "post_id": row.post_id,
+            "author": {
+                "community_id": community.community_id if community else None,
+                "name": community.name if community else "Unknown Community"
+            },
+            "community": {
+                "id": community.community_id if community else None,
+                "name": community.name if community else "Unknown",
+                "avatar": community.avatar if community else None
+            },
+            "title": row.title,
+            "description": row.content,
+            "picture": row.picture,
+            "likes_count": row.likes_count,
+            "comments_count": row.comments_count,
+            "is_community_post": True
+        }
+
+    # Пост от пользователя
+    user = loader.user(row.user_id)
+    return {
+        "post_id": row.post_id,
+        "author": {
+            "user_id": user.user_id if user else None,
+            "username": user.username if user else "Unknown"
+        },
+        "title": row.title,
+        "description": row.content,
+        "picture": row.picture,
+        "likes_count": row.likes_count,
+        "comments_count": row.comments_count,
+        "is_community_post": False
+    }
+
+async def get_posts_page(session: AsyncSession, after: int | None = None, limit: int = 20):
+    # Keyset-пагинация: страница — это диапазон по индексу первичного ключа,
+    # берём на одну строку больше, чтобы понять, есть ли следующая страница
     stmt = select(
         Post.post_id,
         Post.user_id,
@@ -88,56 +158,40 @@ async def get_all_posts(session: AsyncSession):
         Post.content,
         Post.picture,
         Post.likes_count,
-    ).order_by(desc(Post.post_id))
+        Post.comments_count,
+    ).order_by(desc(Post.post_id)).limit(limit + 1)
+    if after is not None:
+        stmt = stmt.where(Post.post_id < after)
 
     result = await session.execute(stmt)
     rows = result.fetchall()
 
-    posts = []
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1].post_id
+
+    loader = RelatedLoader(session)
     for row in rows:
         if row.community_id:
-            # Пост от сообщества
-            from .models.communities import Community
-            community_stmt = select(Community).where(Community.community_id == row.community_id)
-            community_result = await session.execute(community_stmt)
-            community = community_result.scalar_one_or_none()
-            
-            posts.append({
-                "post_id": row.post_id,
-                "author": {
-                    "community_id": community.community_id if community else None,
-                    "name": community.name if community else "Unknown Community"
-                },
-                "community": {
-                    "id": community.community_id if community else None,
-                    "name": community.name if community else "Unknown",
-                    "avatar": community.avatar if community else None
-                },
-                "title": row.title,
-                "description": row.content,
-                "picture": row.picture,
-                "likes_count": row.likes_count,
-                "is_community_post": True
-            })
+            loader.want_community(row.community_id)
         else:
-            # Пост от пользователя
-            user = await get_user_by_id(session, row.user_id) if row.user_id else None
-            posts.append({
-                "post_id": row.post_id,
-                "author": {
-                    "user_id": user.user_id if user else None,
-                    "username": user.username if user else "Unknown"
-                },
-                "title": row.title,
-                "description": row.content,
-                "picture": row.picture,
-                "likes_count": row.likes_count,
-                "is_community_post": False
-            })
-
-    return posts
-
-async def get_community_posts(session: AsyncSession, community_id: int):
+            loader.want_user(row.user_id)
+    await loader.load()
+
+    posts = [_post_to_dict(row, loader) for row in rows]
+
+    return posts, next_after
+
+async def get_community_posts(
+    session: AsyncSession,
+    community_id: int,
+    after: int | None = None,
+    limit: int = 20,
+    comments_preview: int = 3
+):
+    # Страница постов сообщества (keyset, как в ленте) и по comments_preview
+    # последних комментариев к каждому; весь тред — через пагинацию комментариев
     stmt = select(
         Post.post_id,
         Post.user_id,
@@ -146,41 +200,34 @@ async def get_community_posts(session: AsyncSession, community_id: int):
         Post.content,
         Post.picture,
         Post.likes_count,
-    ).where(Post.community_id == community_id).order_by(desc(Post.post_id))
+        Post.comments_count,
+    ).where(Post.community_id == community_id).order_by(desc(Post.post_id)).limit(limit + 1)
+    if after is not None:
+        stmt = stmt.where(Post.post_id < after)
 
     result = await session.execute(stmt)
     rows = result.fetchall()
 
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1].post_id
+
+    loader = RelatedLoader(session)
+    loader.want_community(community_id)
+
+    # Последние комментарии сразу для всех постов страницы
+    comments_by_post = await get_latest_comments_by_post_ids(
+        session, [row.post_id for row in rows], comments_preview, loader
+    )
+
     posts = []
     for row in rows:
-        from .models.communities import Community
-        community_stmt = select(Community).where(Community.community_id == row.community_id)
-        community_result = await session.execute(community_stmt)
-        community = community_result.scalar_one_or_none()
-        
-        # Загружаем комментарии для поста
-        comments = await get_comments_by_post_id(session, row.post_id)
-        
-        posts.append({
-            "post_id": row.post_id,
-            "author": {
-                "community_id": community.community_id if community else None,
-                "name": community.name if community else "Unknown Community"
-            },
-            "community": {
-                "id": community.community_id if community else None,
-                "name": community.name if community else "Unknown",
-                "avatar": community.avatar if community else None
-            },
-            "title": row.title,
-            "description": row.content,
-            "picture": row.picture,
-            "likes_count": row.likes_count,
-            "comments": comments,
-            "is_community_post": True
-        })
+        post = _post_to_dict(row, loader)
+        post["comments"] = comments_by_post.get(row.post_id, [])
+        posts.append(post)
 
-    return posts
+    return posts, next_after
 
 async def get_user_by_id(session: AsyncSession, id):
     stmt = select(User).where(User.user_id == id)
@@ -213,6 +260,65 @@ async def decrease_likes_by_post_id(session: AsyncSession, post_id: int):
     await session.execute(stmt)
     await session.commit()
 
+# Likes
+
+async def apply_like_changes(session: AsyncSession, likes: list[tuple[int, int]], unlikes: list[tuple[int, int]]):
+    """
+    Применяет пачку лайков и снятий лайков (пары (user_id, post_id)) одной транзакцией:
+    один bulk INSERT, один bulk DELETE и одно агрегированное обновление likes_count.
+    Возвращает фактически добавленные и удалённые пары.
+    """
+    added = []
+    removed = []
+
+    if likes:
+        result = await session.execute(
+            text("""
+                INSERT INTO likes (user_id, post_id)
+                SELECT d.user_id, d.post_id
+                FROM unnest(CAST(:uids AS integer[]), CAST(:pids AS integer[])) AS d(user_id, post_id)
+                JOIN posts p ON p.post_id = d.post_id
+                ON CONFLICT DO NOTHING
+                RETURNING user_id, post_id
+            """),
+            {"uids": [uid for uid, _ in likes], "pids": [pid for _, pid in likes]}
+        )
+        added = [(r[0], r[1]) for r in result]
+
+    if unlikes:
+        result = await session.execute(
+            text("""
+                DELETE FROM likes l
+                USING unnest(CAST(:uids AS integer[]), CAST(:pids AS integer[])) AS d(user_id, post_id)
+                WHERE l.user_id = d.user_id AND l.post_id = d.post_id
+                RETURNING l.user_id, l.post_id
+            """),
+            {"uids": [uid for uid, _ in unlikes], "pids": [pid for _, pid in unlikes]}
+        )
+        removed = [(r[0], r[1]) for r in result]
+
+    deltas = {}
+    for _, post_id in added:
+        deltas[post_id] = deltas.get(post_id, 0) + 1
+    for _, post_id in removed:
+        deltas[post_id] = deltas.get(post_id, 0) - 1
+    # Посты обновляются по возрастанию id, чтобы параллельные сбросы брали блокировки в одном порядке
+    deltas = {post_id: delta for post_id, delta in sorted(deltas.items()) if delta}
+
+    if deltas:
+        await session.execute(
+            text("""
+                UPDATE posts p SET likes_count = p.likes_count + d.delta
+                FROM unnest(CAST(:pids AS integer[]), CAST(:deltas AS integer[])) AS d(post_id, delta)
+                WHERE p.post_id = d.post_id
+            """),
+            {"pids": list(deltas), "deltas": list(deltas.values())}
+        )
+
+    await session.commit()
+
+    return added, removed
+
 # User and userdata
 
 async def get_all_users(session: AsyncSession):
@@ -255,6 +361,43 @@ async def get_all_users_data(session: AsyncSession):
 
 
 
+async def get_user_cards(session: AsyncSession, user_ids):
+    # Краткие карточки пользователей одним запросом: user_id -> карточка
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    stmt = (
+        select(User, UserData)
+        .join(UserData, User.user_id == UserData.user_id, isouter=True)
+        .where(User.user_id.in_(user_ids))
+    )
+    result = await session.execute(stmt)
+
+    cards = {}
+    for user, user_data in result:
+        cards[user.user_id] = {
+            "user_id": user.user_id,
+            "username": user.username,
+            "first_name": user_data.first_name if user_data else "",
+            "last_name": user_data.last_name if user_data else "",
+            "avatar": user_data.avatar_url if user_data else DEFAULT_AVATAR_URL,
+        }
+
+    return cards
+
+async def get_profile_by_id(session: AsyncSession, user_id: int):
+    # Пользователь и его данные профиля одним запросом: (User, UserData | None) или None
+    stmt = (
+        select(User, UserData)
+        .join(UserData, User.user_id == UserData.user_id, isouter=True)
+        .where(User.user_id == user_id)
+    )
+    result = await session.execute(stmt)
+    row = result.first()
+
+    return tuple(row) if row else None
+
 async def get_user_data_by_id(session: AsyncSession, id):
     stmt = select(UserData).where(UserData.user_id == id)
     result = await session.execute(stmt)
@@ -262,61 +405,65 @@ async def get_user_data_by_id(session: AsyncSession, id):
 
     return user
 
-async def update_first_name(session: AsyncSession, user_id: int, first_name: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(first_name=first_name)
+async def _update_profile(session: AsyncSession, user_id: int, **values):
+    # Каждое изменение профиля увеличивает profile_version: по нему ETag списков друзей
+    # замечает смену имени, аватара или описания у друга
+    stmt = (
+        update(UserData)
+        .where(UserData.user_id == user_id)
+        .values(**values, profile_version=UserData.profile_version + 1)
+    )
     await session.execute(stmt)
     await session.commit()
 
+async def update_first_name(session: AsyncSession, user_id: int, first_name: str):
+    await _update_profile(session, user_id, first_name=first_name)
+
 async def update_last_name(session: AsyncSession, user_id: int, last_name: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(last_name=last_name)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, last_name=last_name)
 
 async def update_birthday(session: AsyncSession, user_id: int, birthday: datetime):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(birthday=birthday)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, birthday=birthday)
 
 
 async def update_gender(session: AsyncSession, user_id: int, gender: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(gender=gender)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, gender=gender)
 
 async def update_bio(session: AsyncSession, user_id: int, bio: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(bio=bio)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, bio=bio)
 
 async def update_location(session: AsyncSession, user_id: int, city: str, country: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(city=city, country=country)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, city=city, country=country)
 
 async def update_email(session: AsyncSession, user_id: int, email: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(email=email)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, email=email)
 
 async def update_phone(session: AsyncSession, user_id: int, phone: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(phone=phone)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, phone=phone)
 
 
 async def update_avatar(session: AsyncSession, user_id: int, avatar_url: str):
-    stmt = update(UserData).where(UserData.user_id == user_id).values(avatar_url=avatar_url)
-    await session.execute(stmt)
-    await session.commit()
+    await _update_profile(session, user_id, avatar_url=avatar_url)
 
 
 # Friends
 
+# listener(session, user_id, friend_id, created) вызывается после добавления или удаления дружбы
+friendship_listeners = []
+
+async def _notify_friendship_changed(session: AsyncSession, user_id: int, friend_id: int, created: bool):
+    for listener in friendship_listeners:
+        try:
+            await listener(session, user_id, friend_id, created)
+        except Exception:
+            logger.exception("Friendship listener %r failed", listener)
+
 async def create_friendship(session: AsyncSession, user_id: int, friend_id: int): 
     db_friendship = Friendship(user_id=user_id, friend_id=friend_id)
     session.add(db_friendship)
     await session.commit()
     await session.refresh(db_friendship)
+    await _notify_friendship_changed(session, user_id, friend_id, True)
 
     return db_friendship
 
@@ -329,6 +476,23 @@ async def get_user_friends_by_id(session: AsyncSession, id): # worth to check if
 
     return friends_ids
 
+async def get_friends_marker(session: AsyncSession, user_id: int):
+    # Маркер изменений списка друзей для ETag: хэш упорядоченного списка id, а не количество и сумма,
+    # иначе замена друзей 1 и 4 на 2 и 3 дала бы тот же маркер.
+    # Сумма profile_version ловит изменения профилей: при том же наборе друзей версии только растут
+    result = await session.execute(
+        text("""
+            SELECT COUNT(*),
+                   md5(COALESCE(string_agg(CAST(f.friend_id AS TEXT), ',' ORDER BY f.friend_id), '')),
+                   COALESCE(SUM(ud.profile_version), 0)
+            FROM friendship f
+            LEFT JOIN user_data ud ON ud.user_id = f.friend_id
+            WHERE f.user_id = :uid
+        """),
+        {"uid": user_id}
+    )
+    return tuple(result.one())
+
 async def is_friends(session: AsyncSession, user_id: int, friend_id: int):
     stmt = select(Friendship).where(
         Friendship.user_id == user_id,
@@ -344,10 +508,22 @@ async def delete_friendship(session: AsyncSession, user_id: int, friend_id: int)
     )
     result = await session.execute(stmt)
     await session.commit()
+    if result.rowcount > 0:
+        await _notify_friendship_changed(session, user_id, friend_id, False)
     return result.rowcount > 0
 
 # Message
 
+# listener(session, message) вызывается после сохранения нового сообщения
+message_listeners = []
+
+async def _notify_message_created(session: AsyncSession, message: dict):
+    for listener in message_listeners:
+        try:
+            await listener(session, message)
+        except Exception:
+            logger.exception("Message listener %r failed", listener)
+
 async def create_message(session: AsyncSession, sender_id: int, receiver_id: int, content: str = "", picture_url: str = ""):
     db_message = Message(
         sender_id=sender_id,
@@ -356,36 +532,165 @@ async def create_message(session: AsyncSession, sender_id: int, receiver_id: int
         picture_url=picture_url
     )
     session.add(db_message)
+    await session.flush()  # Получаем ID без commit
+    message = _message_to_dict(db_message)
+
+    # Сводки диалога у обоих участников обновляются в той же транзакции:
+    # отправитель своё сообщение уже прочитал, получателю добавляется непрочитанное
+    await session.execute(
+        text("""
+            INSERT INTO conversations (user_id, peer_id, last_message_id, last_read_message_id, unread_count)
+            VALUES (:sender_id, :receiver_id, :message_id, :message_id, 0),
+                   (:receiver_id, :sender_id, :message_id, 0, 1)
+            ON CONFLICT (user_id, peer_id) DO UPDATE SET
+                last_message_id = GREATEST(conversations.last_message_id, EXCLUDED.last_message_id),
+                last_read_message_id = GREATEST(conversations.last_read_message_id, EXCLUDED.last_read_message_id),
+                unread_count = conversations.unread_count + EXCLUDED.unread_count
+        """),
+        {"sender_id": sender_id, "receiver_id": receiver_id, "message_id": message["message_id"]}
+    )
     await session.commit()
-    await session.refresh(db_message)
-    return db_message
-
-async def get_messages_between_users(session: AsyncSession, user1_id: int, user2_id: int):
-    stmt = select(Message).where(
-        ((Message.sender_id == user1_id) & (Message.receiver_id == user2_id)) |
-        ((Message.sender_id == user2_id) & (Message.receiver_id == user1_id))
-    ).order_by(Message.id)
+
+    await _notify_message_created(session, message)
+
+    return message
+
+def conversation_key(user1_id: int, user2_id: int):
+    return min(user1_id, user2_id), max(user1_id, user2_id)
+
+def _message_to_dict(row: Message):
+    return {
+        "message_id": row.id,
+        "sender_id": row.sender_id,
+        "receiver_id": row.receiver_id,
+        "content": row.content,
+        "picture_url": row.picture_url
+    }
+
+async def get_conversation_page(session: AsyncSession, user1_id: int, user2_id: int, before: int | None = None, limit: int = 50):
+    # Keyset-пагинация по индексу ix_messages_conversation: от новых к старым,
+    # before — id последнего полученного сообщения
+    low, high = conversation_key(user1_id, user2_id)
+    stmt = (
+        select(Message)
+        .where(
+            func.least(Message.sender_id, Message.receiver_id) == low,
+            func.greatest(Message.sender_id, Message.receiver_id) == high
+        )
+        .order_by(desc(Message.id))
+        .limit(limit + 1)
+    )
+    if before is not None:
+        stmt = stmt.where(Message.id < before)
+
     result = await session.execute(stmt)
     rows = result.scalars().all()
 
-    messages = [
-        {
-            "sender_id": row.sender_id, 
-            "receiver_id": row.receiver_id, 
-            "content": row.content, 
-            "picture_url": row.picture_url
-        } 
-        for row in rows
-        ]
-    
-    return messages
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = rows[-1].id
+
+    return [_message_to_dict(row) for row in rows], next_before
 
 async def delete_message(session: AsyncSession, message_id: int):
-    stmt = delete(Message).where(Message.id == message_id)
-    await session.execute(stmt)
+    stmt = delete(Message).where(Message.id == message_id).returning(Message.sender_id, Message.receiver_id)
+    result = await session.execute(stmt)
+    row = result.first()
+    if row is None:
+        await session.commit()
+        return False
+    sender_id, receiver_id = row
+
+    # Непрочитанное удалённое сообщение больше не считается у получателя
+    await session.execute(
+        update(Conversation)
+        .where(
+            Conversation.user_id == receiver_id,
+            Conversation.peer_id == sender_id,
+            Conversation.last_read_message_id < message_id,
+            Conversation.unread_count > 0
+        )
+        .values(unread_count=Conversation.unread_count - 1)
+    )
+
+    # Если удалили последнее сообщение, превью переходит на предыдущее (один шаг по индексу диалога)
+    low, high = conversation_key(sender_id, receiver_id)
+    previous_id = (
+        select(Message.id)
+        .where(
+            func.least(Message.sender_id, Message.receiver_id) == low,
+            func.greatest(Message.sender_id, Message.receiver_id) == high
+        )
+        .order_by(desc(Message.id))
+        .limit(1)
+        .scalar_subquery()
+    )
+    pair = (
+        ((Conversation.user_id == sender_id) & (Conversation.peer_id == receiver_id))
+        | ((Conversation.user_id == receiver_id) & (Conversation.peer_id == sender_id))
+    )
+    result = await session.execute(
+        update(Conversation)
+        .where(pair, Conversation.last_message_id == message_id)
+        .values(last_message_id=func.coalesce(previous_id, 0))
+    )
+    if result.rowcount:
+        # Диалог опустел — убираем его из списка
+        await session.execute(delete(Conversation).where(pair, Conversation.last_message_id == 0))
+
     await session.commit()
     return True
 
+async def get_inbox(session: AsyncSession, user_id: int, before: int | None = None, limit: int = 20):
+    """
+    Страница диалогов пользователя от свежих к старым с превью последнего сообщения.
+    Читает только сводки из conversations и по одному сообщению на диалог,
+    before — last_message_id последнего полученного диалога.
+    """
+    stmt = (
+        select(Conversation, Message)
+        .join(Message, Message.id == Conversation.last_message_id)
+        .where(Conversation.user_id == user_id)
+        .order_by(desc(Conversation.last_message_id))
+        .limit(limit + 1)
+    )
+    if before is not None:
+        stmt = stmt.where(Conversation.last_message_id < before)
+
+    result = await session.execute(stmt)
+    rows = result.all()
+
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = rows[-1][0].last_message_id
+
+    cards = await get_user_cards(session, [conversation.peer_id for conversation, _ in rows])
+
+    return [
+        {
+            "peer": cards.get(conversation.peer_id, {"user_id": conversation.peer_id}),
+            "last_message": _message_to_dict(message),
+            "unread_count": conversation.unread_count,
+        }
+        for conversation, message in rows
+    ], next_before
+
+async def get_unread_total(session: AsyncSession, user_id: int):
+    result = await session.execute(
+        select(func.coalesce(func.sum(Conversation.unread_count), 0)).where(Conversation.user_id == user_id)
+    )
+    return result.scalar()
+
+async def mark_conversation_read(session: AsyncSession, user_id: int, peer_id: int):
+    await session.execute(
+        update(Conversation)
+        .where(Conversation.user_id == user_id, Conversation.peer_id == peer_id)
+        .values(last_read_message_id=Conversation.last_message_id, unread_count=0)
+    )
+    await session.commit()
+
 # Comments
 
 async def create_comment(session: AsyncSession, post_id: int, user_id: int, content: str):
@@ -393,6 +698,10 @@ async def create_comment(session: AsyncSession, post_id: int, user_id: int, cont
     session.add(db_comment)
     await session.flush()  # Получаем ID без commit
     comment_id = db_comment.comment_id  # Сохраняем ID до commit
+    # Счётчик комментариев поста обновляется в той же транзакции
+    await session.execute(
+        update(Post).where(Post.post_id == post_id).values(comments_count=Post.comments_count + 1)
+    )
     await session.commit()
 
     return {
@@ -402,24 +711,92 @@ async def create_comment(session: AsyncSession, post_id: int, user_id: int, cont
         "content": content
     }
 
-async def get_comments_by_post_id(session: AsyncSession, post_id: int):
-    stmt = select(Comment).where(Comment.post_id == post_id).order_by(desc(Comment.comment_id))
+def _comment_to_dict(row, loader: RelatedLoader):
+    user = loader.user(row.user_id)
+    return {
+        "comment_id": row.comment_id,
+        "post_id": row.post_id,
+        "author": {
+            "user_id": user.user_id if user else None,
+            "username": user.username if user else "Unknown"
+        },
+        "content": row.content,
+    }
+
+async def get_comments_page(session: AsyncSession, post_id: int, before: int | None = None, limit: int = 20):
+    # Keyset-пагинация от новых к старым: before — comment_id последнего полученного комментария
+    stmt = (
+        select(Comment)
+        .where(Comment.post_id == post_id)
+        .order_by(desc(Comment.comment_id))
+        .limit(limit + 1)
+    )
+    if before is not None:
+        stmt = stmt.where(Comment.comment_id < before)
+
     result = await session.execute(stmt)
     rows = result.scalars().all()
-    
-    comments = []
+
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = rows[-1].comment_id
+
+    loader = RelatedLoader(session)
     for row in rows:
-        user = await get_user_by_id(session, row.user_id)
-        comments.append({
-            "comment_id": row.comment_id,
-            "post_id": row.post_id,
-            "author": {
-                "user_id": user.user_id if user else None,
-                "username": user.username if user else "Unknown"
-            },
-            "content": row.content,
-        })
-    
+        loader.want_user(row.user_id)
+    await loader.load()
+
+    return [_comment_to_dict(row, loader) for row in rows], next_before
+
+async def get_comments_marker(session: AsyncSession, post_id: int):
+    # Комментарии только добавляются, поэтому хватает счётчика поста
+    result = await session.execute(
+        select(Post.comments_count).where(Post.post_id == post_id)
+    )
+    return result.scalar_one_or_none()
+
+async def get_latest_comments_by_post_ids(
+    session: AsyncSession,
+    post_ids: list[int],
+    per_post: int,
+    loader: RelatedLoader | None = None
+):
+    # До per_post последних комментариев каждого поста одним оконным запросом: post_id -> список
+    if not post_ids or per_post <= 0:
+        if loader:
+            await loader.load()
+        return {}
+
+    ranked = (
+        select(
+            Comment,
+            func.row_number().over(
+                partition_by=Comment.post_id,
+                order_by=desc(Comment.comment_id)
+            ).label("rn")
+        )
+        .where(Comment.post_id.in_(post_ids))
+        .subquery()
+    )
+    comment = aliased(Comment, ranked)
+    stmt = (
+        select(comment)
+        .where(ranked.c.rn <= per_post)
+        .order_by(ranked.c.post_id, desc(ranked.c.comment_id))
+    )
+    result = await session.execute(stmt)
+    rows = result.scalars().all()
+
+    loader = loader or RelatedLoader(session)
+    for row in rows:
+        loader.want_user(row.user_id)
+    await loader.load()
+
+    comments = {}
+    for row in rows:
+        comments.setdefault(row.post_id, []).append(_comment_to_dict(row, loader))
+
     return comments
 
 # Communities
@@ -513,19 +890,61 @@ async def get_all_communities(session: AsyncSession, user_id: int = None):
     
     return communities
 
+async def get_communities_marker(session: AsyncSession, user_id: int = None):
+    # Маркер изменений списка сообществ и подписок пользователя для ETag.
+    # Подписки хэшируются упорядоченным списком id, чтобы разные наборы не совпадали по маркеру
+    result = await session.execute(
+        text("""
+            SELECT
+                (SELECT COUNT(*) FROM communities),
+                (SELECT COALESCE(MAX(community_id), 0) FROM communities),
+                (SELECT md5(COALESCE(string_agg(CAST(community_id AS TEXT), ',' ORDER BY community_id), ''))
+                 FROM user_community WHERE user_id = :uid)
+        """),
+        {"uid": user_id or 0}
+    )
+    return tuple(result.one())
+
+async def get_community_marker(session: AsyncSession, community_id: int, user_id: int = None):
+    """
+    Маркер изменений страницы сообщества для ETag: посты, их лайки, комментарии к ним
+    и подписка пользователя. Сумма likes_count * post_id нужна, чтобы лайк одного поста
+    и снятие лайка с другого не давали тот же маркер.
+    """
+    result = await session.execute(
+        text("""
+            SELECT
+                (SELECT COUNT(*) FROM communities WHERE community_id = :cid),
+                p.cnt, p.max_id, p.likes, p.weighted_likes, p.comments,
+                (SELECT COUNT(*) FROM user_community WHERE user_id = :uid AND community_id = :cid)
+            FROM (
+                SELECT
+                    COUNT(*) AS cnt,
+                    COALESCE(MAX(post_id), 0) AS max_id,
+                    COALESCE(SUM(likes_count), 0) AS likes,
+                    COALESCE(SUM(CAST(likes_count AS BIGINT) * post_id), 0) AS weighted_likes,
+                    COALESCE(SUM(comments_count), 0) AS comments
+                FROM posts WHERE community_id = :cid
+            ) p
+        """),
+        {"cid": community_id, "uid": user_id or 0}
+    )
+    return tuple(result.one())
+
 async def get_user_communities(session: AsyncSession, user_id: int):
     # Получаем все подписки пользователя на сообщества
     stmt = select(UserCommunity).where(UserCommunity.user_id == user_id)
     result = await session.execute(stmt)
     subscriptions = result.scalars().all()
     
+    loader = RelatedLoader(session)
+    for sub in subscriptions:
+        loader.want_community(sub.community_id)
+    await loader.load()
+
     communities = []
     for sub in subscriptions:
-        # Получаем информацию о сообществе
-        community_stmt = select(Community).where(Community.community_id == sub.community_id)
-        community_result = await session.execute(community_stmt)
-        community = community_result.scalar_one_or_none()
-        
+        community = loader.community(sub.community_id)
         if community:
             communities.append({
                 "id": community.community_id,
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+
+from ..config import LIKE_FLUSH_INTERVAL, LIKE_FLUSH_MAX_BATCH
+from .db import SessionLocal, apply_like_changes
+
+
+logger = logging.getLogger(__name__)
+
+
+class LikeWriteBuffer:
+    """
+    Копит лайки в памяти и периодически сбрасывает их в БД одной транзакцией.
+    Повторные действия одного пользователя с одним постом внутри окна схлопываются:
+    в БД попадает только последнее.
+    """
+
+    def __init__(self, session_factory, flush_interval: float, max_batch: int):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending = {}  # (user_id, post_id) -> True (лайк) / False (снятие лайка)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._stopping = False
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """listener(session, added, removed) вызывается после каждого успешного сброса"""
+        self._listeners.append(listener)
+
+    def like(self, user_id: int, post_id: int):
+        self._push(user_id, post_id, True)
+
+    def unlike(self, user_id: int, post_id: int):
+        self._push(user_id, post_id, False)
+
+    def _push(self, user_id: int, post_id: int, liked: bool):
+        self._pending[(user_id, post_id)] = liked
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        # Один порядок строк во всех процессах, чтобы параллельные сбросы не взаимоблокировались
+        likes = sorted(key for key, liked in batch.items() if liked)
+        unlikes = sorted(key for key, liked in batch.items() if not liked)
+
+        async with self.session_factory() as session:
+            try:
+                added, removed = await apply_like_changes(session, likes, unlikes)
+            except BaseException:
+                # Возвращаем пачку в буфер, не перетирая более свежие действия
+                # (и при отмене задачи: подтверждённые лайки не должны теряться)
+                for key, liked in batch.items():
+                    self._pending.setdefault(key, liked)
+                raise
+
+            for listener in self._listeners:
+                try:
+                    await listener(session, added, removed)
+                except Exception:
+                    logger.exception("Like listener %r failed", listener)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush likes, will retry")
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Не отменяем задачу посреди сброса: просим цикл завершиться и ждём его
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+like_buffer = LikeWriteBuffer(SessionLocal, LIKE_FLUSH_INTERVAL, LIKE_FLUSH_MAX_BATCH)
@@ -0,0 +1,46 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from .models.user import User
+from .models.communities import Community
+
+
+class RelatedLoader:
+    """
+    Собирает id авторов и сообществ, на которые ссылается выборка,
+    и загружает их одним запросом на каждый тип сущности.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._pending_users = set()
+        self._pending_communities = set()
+        self.users = {}
+        self.communities = {}
+
+    def want_user(self, user_id):
+        if user_id is not None and user_id not in self.users:
+            self._pending_users.add(user_id)
+
+    def want_community(self, community_id):
+        if community_id is not None and community_id not in self.communities:
+            self._pending_communities.add(community_id)
+
+    async def load(self):
+        if self._pending_users:
+            stmt = select(User).where(User.user_id.in_(self._pending_users))
+            result = await self.session.execute(stmt)
+            self.users.update({user.user_id: user for user in result.scalars()})
+            self._pending_users.clear()
+
+        if self._pending_communities:
+            stmt = select(Community).where(Community.community_id.in_(self._pending_communities))
+            result = await self.session.execute(stmt)
+            self.communities.update({c.community_id: c for c in result.scalars()})
+            self._pending_communities.clear()
+
+    def user(self, user_id):
+        return self.users.get(user_id)
+
+    def community(self, community_id):
+        return self.communities.get(community_id)
@@ -0,0 +1,270 @@
+"""
+Версионированные миграции схемы.
+
+Миграция — async-функция от соединения. Они применяются по порядку номеров
+в одной транзакции, применённые версии записываются в schema_migrations.
+Миграции пишутся явным SQL, а не от текущих моделей, чтобы их результат
+не менялся вместе с моделями. Базы, созданные до миграций, уже содержат
+часть схемы, поэтому шаги идемпотентны (IF NOT EXISTS).
+
+Новую миграцию только добавляют в конец MIGRATIONS, уже выпущенные не меняют.
+
+Индексы строятся обычным CREATE INDEX внутри транзакции запуска: на заполненной
+базе это блокирует запись в таблицу на всё время построения. Для большой базы
+индексы новой миграции стоит заранее создать вручную через CREATE INDEX CONCURRENTLY
+с теми же именами — тогда при старте IF NOT EXISTS их пропустит.
+"""
+import logging
+
+from sqlalchemy import text
+
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки: несколько воркеров не накатывают миграции одновременно
+MIGRATION_LOCK_ID = 7_301_001
+
+
+async def _execute_all(conn, statements):
+    for statement in statements:
+        await conn.execute(text(statement))
+
+
+async def _initial_schema(conn):
+    # Схема, которую раньше создавал init_db через create_all
+    await _execute_all(conn, (
+        """
+        CREATE TABLE IF NOT EXISTS "user" (
+            user_id SERIAL NOT NULL,
+            username VARCHAR NOT NULL,
+            hashed_password VARCHAR NOT NULL,
+            PRIMARY KEY (user_id),
+            UNIQUE (username),
+            UNIQUE (hashed_password)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id SERIAL NOT NULL,
+            first_name VARCHAR NOT NULL,
+            last_name VARCHAR NOT NULL,
+            birthday TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            gender VARCHAR NOT NULL,
+            email VARCHAR,
+            phone VARCHAR,
+            avatar_url VARCHAR NOT NULL,
+            bio TEXT NOT NULL,
+            city VARCHAR NOT NULL,
+            country VARCHAR NOT NULL,
+            is_active BOOLEAN,
+            PRIMARY KEY (user_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS friendship (
+            user_id INTEGER NOT NULL,
+            friend_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, friend_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            post_id SERIAL NOT NULL,
+            user_id INTEGER,
+            community_id INTEGER,
+            title VARCHAR NOT NULL,
+            content VARCHAR NOT NULL,
+            picture VARCHAR,
+            likes_count INTEGER NOT NULL,
+            PRIMARY KEY (post_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS comments (
+            comment_id SERIAL NOT NULL,
+            post_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (comment_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS likes (
+            user_id INTEGER NOT NULL,
+            post_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, post_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            tag_id SERIAL NOT NULL,
+            name VARCHAR NOT NULL,
+            PRIMARY KEY (tag_id),
+            UNIQUE (name)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS post_tags (
+            post_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY (post_id, tag_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS communities (
+            community_id SERIAL NOT NULL,
+            name VARCHAR NOT NULL,
+            description TEXT,
+            avatar VARCHAR,
+            PRIMARY KEY (community_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_community (
+            user_id INTEGER NOT NULL,
+            community_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, community_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            id SERIAL NOT NULL,
+            sender_id INTEGER NOT NULL,
+            receiver_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            picture_url VARCHAR,
+            PRIMARY KEY (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS recommendations (
+            user_id INTEGER NOT NULL,
+            kind VARCHAR NOT NULL,
+            rank INTEGER NOT NULL,
+            item_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, kind, rank)
+        )
+        """,
+    ))
+
+
+async def _posts_comments_count(conn):
+    # Счётчик комментариев поста, один раз заполняется по таблице comments
+    result = await conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'posts' AND column_name = 'comments_count'
+    """))
+    if result.first():
+        return
+
+    await conn.execute(text("ALTER TABLE posts ADD COLUMN comments_count INTEGER NOT NULL DEFAULT 0"))
+    await conn.execute(text("""
+        UPDATE posts p SET comments_count = c.cnt
+        FROM (SELECT post_id, COUNT(*) AS cnt FROM comments GROUP BY post_id) c
+        WHERE p.post_id = c.post_id
+    """))
+
+
+async def _messages_conversation_index(conn):
+    # Переписка в обе стороны читается одним диапазоном по упорядоченной паре id
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_messages_conversation
+        ON messages (least(sender_id, receiver_id), greatest(sender_id, receiver_id), id)
+    """))
+
+
+async def _conversations(conn):
+    await _execute_all(conn, (
+        """
+        CREATE TABLE IF NOT EXISTS conversations (
+            user_id INTEGER NOT NULL,
+            peer_id INTEGER NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            last_read_message_id INTEGER DEFAULT 0 NOT NULL,
+            unread_count INTEGER DEFAULT 0 NOT NULL,
+            PRIMARY KEY (user_id, peer_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_conversations_inbox ON conversations (user_id, last_message_id)",
+    ))
+    # Сводки по уже существующей переписке, старые сообщения считаем прочитанными
+    await conn.execute(text("""
+        INSERT INTO conversations (user_id, peer_id, last_message_id, last_read_message_id, unread_count)
+        SELECT user_id, peer_id, MAX(id), MAX(id), 0
+        FROM (
+            SELECT sender_id AS user_id, receiver_id AS peer_id, id FROM messages
+            UNION ALL
+            SELECT receiver_id, sender_id, id FROM messages
+        ) m
+        WHERE NOT EXISTS (SELECT 1 FROM conversations)
+        GROUP BY user_id, peer_id
+    """))
+
+
+async def _hot_path_indexes(conn):
+    # Вторым столбцом идёт ключ сортировки или соединения, чтобы хватало индекса без сортировки:
+    # посты сообщества и комментарии поста листаются по id, лайки и теги соединяются по второму id
+    await _execute_all(conn, (
+        "CREATE INDEX IF NOT EXISTS ix_posts_community ON posts (community_id, post_id)",
+        "CREATE INDEX IF NOT EXISTS ix_comments_post ON comments (post_id, comment_id)",
+        "CREATE INDEX IF NOT EXISTS ix_likes_post ON likes (post_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_post_tags_tag ON post_tags (tag_id, post_id)",
+    ))
+
+
+async def _friendship_friend_index(conn):
+    # Первичный ключ начинается с user_id, а сброс кэша рекомендаций при изменении дружбы
+    # ищет тех, у кого пользователь в друзьях (WHERE friend_id = ...)
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_friendship_friend ON friendship (friend_id, user_id)"
+    ))
+
+
+async def _drop_ordered_post_recommendations(conn):
+    # Посты пересчёта теперь хранятся по источникам (posts_likes, posts_tags, posts_combined),
+    # строки старого вида "posts" с готовым порядком больше никто не читает
+    await conn.execute(text("DELETE FROM recommendations WHERE kind = 'posts'"))
+
+
+async def _user_data_profile_version(conn):
+    # Версия профиля для ETag списка друзей
+    await conn.execute(text(
+        "ALTER TABLE user_data ADD COLUMN IF NOT EXISTS profile_version INTEGER NOT NULL DEFAULT 0"
+    ))
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "posts.comments_count", _posts_comments_count),
+    (3, "messages conversation index", _messages_conversation_index),
+    (4, "conversations", _conversations),
+    (5, "hot path indexes", _hot_path_indexes),
+    (6, "friendship friend_id index", _friendship_friend_index),
+    (7, "post recommendations by source", _drop_ordered_post_recommendations),
+    (8, "user_data.profile_version", _user_data_profile_version),
+]
+
+
+async def migrate(conn):
+    """Применяет недостающие миграции; conn должен быть внутри транзакции (engine.begin())"""
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    applied = {row[0] for row in result}
+
+    for version, name, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info("Applying migration %04d %s", version, name)
+        await migration(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name}
+        )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Index, Integer, String, Text
 from .base import Base
 
 class Comment(Base):
@@ -9,3 +9,8 @@ class Comment(Base):
     user_id = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
 
+    __table_args__ = (
+        # Комментарии поста от новых к старым
+        Index("ix_comments_post", post_id, comment_id),
+    )
+
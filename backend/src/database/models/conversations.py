@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Index, Integer
+from .base import Base
+
+class Conversation(Base):
+    """
+    Сводка диалога для одного участника: по строке на (user_id, peer_id).
+    Обновляется вместе с сообщениями, чтобы список диалогов не сканировал messages.
+    """
+    __tablename__ = "conversations"
+
+    user_id = Column(Integer, primary_key=True)
+    peer_id = Column(Integer, primary_key=True)
+    last_message_id = Column(Integer, nullable=False)
+    # Последнее сообщение, которое user_id видел в этом диалоге
+    last_read_message_id = Column(Integer, default=0, server_default="0", nullable=False)
+    unread_count = Column(Integer, default=0, server_default="0", nullable=False)
+
+    __table_args__ = (
+        # Список диалогов пользователя от свежих к старым
+        Index("ix_conversations_inbox", user_id, last_message_id),
+    )
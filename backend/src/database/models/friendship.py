@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, Index, Integer
 
 from .base import Base
 
@@ -7,3 +7,8 @@ class Friendship(Base):
 
     user_id = Column(Integer, primary_key=True)
     friend_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        # У кого пользователь в друзьях: первичный ключ начинается с user_id
+        Index("ix_friendship_friend", friend_id, user_id),
+    )
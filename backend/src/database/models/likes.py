@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, Index, Integer
 
 from .base import Base
 
@@ -7,3 +7,8 @@ class Like(Base):
 
     user_id = Column(Integer, primary_key=True)
     post_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        # Первичный ключ начинается с user_id; кто лайкнул пост — отдельный индекс
+        Index("ix_likes_post", post_id, user_id),
+    )
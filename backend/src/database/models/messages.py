@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Index, Integer, String, Text, func
 from .base import Base
 
 class Message(Base):
@@ -9,3 +9,14 @@ class Message(Base):
     receiver_id = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
     picture_url = Column(String)
+
+    __table_args__ = (
+        # Ключ диалога — упорядоченная пара id, чтобы переписка в обе стороны
+        # читалась одним диапазоном индекса (от новых к старым — обратным сканированием)
+        Index(
+            "ix_messages_conversation",
+            func.least(sender_id, receiver_id),
+            func.greatest(sender_id, receiver_id),
+            id
+        ),
+    )
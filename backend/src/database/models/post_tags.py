@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, Index, Integer
 
 from .base import Base
 
@@ -6,4 +6,9 @@ class PostTag(Base):
     __tablename__ = "post_tags"
 
     post_id = Column(Integer, primary_key=True)
-    tag_id = Column(Integer, primary_key=True)
\ No newline at end of file
+    tag_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        # Посты с данным тегом
+        Index("ix_post_tags_tag", tag_id, post_id),
+    )
\ No newline at end of file
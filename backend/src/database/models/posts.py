@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 
 from .base import Base
 
@@ -12,4 +12,10 @@ class Post(Base):
     content = Column(String, nullable=False)
     picture = Column(String, nullable=True, default=None)
     likes_count = Column(Integer, default=0, nullable=False)
+    comments_count = Column(Integer, default=0, server_default="0", nullable=False)
+
+    __table_args__ = (
+        # Посты сообщества от новых к старым
+        Index("ix_posts_community", community_id, post_id),
+    )
 
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+
+from .base import Base
+
+class Recommendation(Base):
+    __tablename__ = "recommendations"
+
+    user_id = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)  # "posts_likes", "posts_tags", "posts_combined" или "users"
+    rank = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False)
@@ -22,3 +22,5 @@ class UserData(Base):
     city = Column(String, nullable=False, default="Пусто")
     country = Column(String, nullable=False, default="Пусто")
     is_active = Column(Boolean, default=True)
+    # Растёт при каждом изменении профиля, входит в ETag списка друзей
+    profile_version = Column(Integer, default=0, server_default="0", nullable=False)
@@ -1,7 +1,9 @@
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .utils import oauth2_scheme, verify_token
+from .database.db import get_user_id_by_username
+from .utils import oauth2_scheme, verify_token, decode_token
 
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -11,7 +13,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
     return {
-        "username": username
+        "username": username,
+        "user_id": payload.get("user_id")
     }
 
 
@@ -22,13 +25,22 @@ async def get_current_user_optional(
         return None
     try:
         token = credentials.credentials
-        import jwt
-        payload = jwt.decode(token, "secret_key", algorithms=["HS256"])
+        payload = decode_token(token)
         username = payload.get("sub")
         if username is None:
             return None
         return {
-            "username": username
+            "username": username,
+            "user_id": payload.get("user_id")
         }
     except:
-        return None
\ No newline at end of file
+        return None
+
+
+async def resolve_user_id(session: AsyncSession, user: dict | None):
+    # Токены, выданные до появления user_id в claims, разрешаем через кэш по username
+    if user is None:
+        return None
+    if user.get("user_id") is not None:
+        return user["user_id"]
+    return await get_user_id_by_username(session, user["username"])
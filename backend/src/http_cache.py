@@ -0,0 +1,52 @@
+"""
+Условные GET-запросы: ETag строится из дешёвых маркеров изменений
+(число строк, максимальный id, суммы счётчиков), поэтому при совпадении
+можно ответить 304, не собирая и не сериализуя полный ответ.
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+
+# Увеличить при изменении формата ответов, чтобы старые ETag перестали совпадать
+ETAG_VERSION = 1
+
+# Ответ зависит от текущего пользователя: только кэш браузера, всегда с перепроверкой
+PRIVATE_REVALIDATE = "private, no-cache"
+# Одинаков для всех: можно хранить и в общих кэшах, но тоже с перепроверкой
+PUBLIC_REVALIDATE = "public, no-cache"
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(repr((ETAG_VERSION, *parts)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str):
+    return tag.strip().removeprefix("W/")
+
+
+def is_not_modified(request: Request, etag: str):
+    """Слабое сравнение с If-None-Match (RFC 9110, 13.1.2)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def _headers(etag: str, cache_control: str):
+    return {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Authorization",
+    }
+
+
+def not_modified(etag: str, cache_control: str):
+    return Response(status_code=304, headers=_headers(etag, cache_control))
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str):
+    response.headers.update(_headers(etag, cache_control))
@@ -0,0 +1,217 @@
+"""
+Метрики приложения в формате Prometheus.
+
+Число SQL-запросов и время в базе считаются через события SQLAlchemy
+и привязываются к текущему HTTP-запросу через contextvar.
+"""
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .config import QUERY_BUDGET
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Значение снимается в момент экспорта вызовом getter().
+    kind="counter" — для уже накопленных где-то счётчиков (например, попаданий в кэш).
+    """
+
+    def __init__(self, name: str, help: str, getter, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.getter = getter
+        self.kind = kind
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", f"{self.name} {self.getter()}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.label_names = labels
+        self._series = {}  # labels -> [счётчики по корзинам..., +Inf], sum
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = (*self.label_names, "le")
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, (*labels, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", LATENCY_BUCKETS, ("method", "route")
+))
+request_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements per HTTP request", QUERY_COUNT_BUCKETS, ("method", "route")
+))
+request_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", LATENCY_BUCKETS, ("method", "route")
+))
+query_budget_exceeded = registry.register(Counter(
+    "http_request_query_budget_exceeded_total", "Requests that ran more SQL statements than QUERY_BUDGET", ("route",)
+))
+db_queries = registry.register(Counter("db_queries_total", "SQL statements executed"))
+db_query_time = registry.register(Counter("db_query_seconds_total", "Time spent executing SQL"))
+pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", POOL_WAIT_BUCKETS
+))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Статистика текущего HTTP-запроса; None вне запроса (фоновые задачи)
+current_request = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_queries.inc()
+    db_query_time.inc(amount=elapsed)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(context):
+    # after_cursor_execute не вызывается при ошибке — убираем свою отметку времени
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание свободного соединения"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine):
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+    pool = sync_engine.pool
+    if isinstance(pool, TimedQueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        registry.register(Gauge("db_pool_checked_out", "Connections currently checked out", pool.checkedout))
+        registry.register(Gauge("db_pool_capacity", "Pool size plus max overflow", lambda: capacity))
+        registry.register(Gauge(
+            "db_pool_saturation", "Share of pool capacity in use",
+            lambda: round(pool.checkedout() / capacity, 3) if capacity else 0
+        ))
+
+
+def register_cache(name: str, cache):
+    """Экспорт счётчиков попаданий любого кэша с атрибутами hits и misses"""
+    registry.register(Gauge(f"{name}_hits_total", f"{name} hits", lambda: cache.hits, kind="counter"))
+    registry.register(Gauge(f"{name}_misses_total", f"{name} misses", lambda: cache.misses, kind="counter"))
+
+
+def start_request():
+    stats = RequestStats()
+    current_request.set(stats)
+    return stats
+
+
+def finish_request(stats: RequestStats, method: str, route: str, status: int, elapsed: float):
+    http_requests.inc(method, route, status)
+    http_latency.observe(elapsed, method, route)
+    request_queries.observe(stats.queries, method, route)
+    request_db_time.observe(stats.db_time, method, route)
+
+    if QUERY_BUDGET and stats.queries > QUERY_BUDGET:
+        query_budget_exceeded.inc(route)
+        logger.warning(
+            "%s %s ran %d SQL statements (budget %d), possible N+1",
+            method, route, stats.queries, QUERY_BUDGET
+        )
@@ -2,12 +2,14 @@ from .mainpage import router as mainpage_router
 from .communities import router as communities_router
 from .profile import router as profile_router
 from .friends import router as friends_router
-#from .messages import router as messages_router
+from .metrics import router as metrics_router
+from .messages import router as messages_router
 
 def include_routers(app):
     app.include_router(mainpage_router, prefix='/api')
     app.include_router(communities_router, prefix='/api')
     app.include_router(profile_router, prefix='/api')
-    #app.include_router(messages_router, prefix='/api')
+    app.include_router(messages_router, prefix='/api')
     app.include_router(friends_router, prefix='/api')
+    app.include_router(metrics_router)
 
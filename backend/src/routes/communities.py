@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
@@ -8,16 +8,19 @@ from ..database.db import (
     get_db,
     get_user_communities,
     get_all_communities,
-    get_by_username,
     create_community,
     subscribe_user_to_community,
     get_community_by_id,
     is_user_subscribed,
     unsubscribe_user_from_community,
-    get_community_posts
+    get_community_posts,
+    get_communities_marker,
+    get_community_marker
 )
 
-from ..dependencies import get_current_user, get_current_user_optional
+from ..dependencies import get_current_user, get_current_user_optional, resolve_user_id
+from ..utils import encode_cursor, decode_cursor
+from ..http_cache import PRIVATE_REVALIDATE, is_not_modified, make_etag, not_modified, set_cache_headers
 
 
 router = APIRouter()
@@ -25,17 +28,22 @@ router = APIRouter()
 
 @router.get('/communities')
 async def get_all_communities_route(
+    request: Request,
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[dict | None, Depends(get_current_user_optional)] = None
 ):
     try:
-        user_id = None
-        if user:
-            db_user = await get_by_username(session, user["username"])
-            if db_user:
-                user_id = db_user.user_id
-        
+        user_id = await resolve_user_id(session, user)
+
+        # Если с прошлого запроса ничего не поменялось, список не собираем
+        marker = await get_communities_marker(session, user_id)
+        etag = make_etag("communities", user_id, marker)
+        if is_not_modified(request, etag):
+            return not_modified(etag, PRIVATE_REVALIDATE)
+
         communities = await get_all_communities(session, user_id)
+        set_cache_headers(response, etag, PRIVATE_REVALIDATE)
         return communities
     except HTTPException:
         raise
@@ -46,10 +54,28 @@ async def get_all_communities_route(
 @router.get('/communities/{community_id}')
 async def get_community(
     community_id: int,
+    request: Request,
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
-    user: Annotated[dict | None, Depends(get_current_user_optional)] = None
+    user: Annotated[dict | None, Depends(get_current_user_optional)] = None,
+    after: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
 ):
     try:
+        after_id = decode_cursor(after) if after else None
+
+        user_id = None
+        if user:
+            try:
+                user_id = await resolve_user_id(session, user)
+            except:
+                pass  # Если ошибка при определении пользователя, показываем страницу как гостю
+
+        marker = await get_community_marker(session, community_id, user_id)
+        etag = make_etag("community", community_id, user_id, after_id, limit, marker)
+        if marker[0] and is_not_modified(request, etag):
+            return not_modified(etag, PRIVATE_REVALIDATE)
+
         # Получаем сообщество по ID
         community = await get_community_by_id(session, community_id)
         if not community:
@@ -57,20 +83,20 @@ async def get_community(
         
         # Если пользователь авторизован, проверяем подписку
         is_subscribed = False
-        if user:
+        if user_id:
             try:
-                db_user = await get_by_username(session, user["username"])
-                if db_user:
-                    is_subscribed = await is_user_subscribed(session, db_user.user_id, community_id)
+                is_subscribed = await is_user_subscribed(session, user_id, community_id)
             except:
                 pass  # Если ошибка при проверке подписки, просто оставляем False
         
         community["is_subscribed"] = is_subscribed
         
-        # Получаем посты сообщества
-        posts = await get_community_posts(session, community_id)
+        # Страница постов сообщества с последними комментариями
+        posts, next_after = await get_community_posts(session, community_id, after=after_id, limit=limit)
         community["posts"] = posts
+        community["next_cursor"] = encode_cursor(next_after) if next_after is not None else None
         
+        set_cache_headers(response, etag, PRIVATE_REVALIDATE)
         return community
     except HTTPException:
         raise
@@ -85,9 +111,9 @@ async def subscribe_to_community(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        # Получаем user_id текущего пользователя
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Проверяем, существует ли сообщество
@@ -96,7 +122,7 @@ async def subscribe_to_community(
             raise HTTPException(status_code=404, detail="Community not found")
         
         # Подписываем пользователя
-        subscription = await subscribe_user_to_community(session, db_user.user_id, community_id)
+        subscription = await subscribe_user_to_community(session, current_user_id, community_id)
         if subscription is None:
             return {"message": "Already subscribed", "is_subscribed": True}
         
@@ -114,9 +140,9 @@ async def unsubscribe_from_community(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        # Получаем user_id текущего пользователя
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Проверяем, существует ли сообщество
@@ -125,7 +151,7 @@ async def unsubscribe_from_community(
             raise HTTPException(status_code=404, detail="Community not found")
         
         # Отписываем пользователя
-        success = await unsubscribe_user_from_community(session, db_user.user_id, community_id)
+        success = await unsubscribe_user_from_community(session, current_user_id, community_id)
         if not success:
             return {"message": "Not subscribed", "is_subscribed": False}
         
@@ -142,13 +168,13 @@ async def get_my_communities(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        # Получаем user_id текущего пользователя
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Получаем сообщества текущего пользователя
-        communities = await get_user_communities(session, db_user.user_id)
+        communities = await get_user_communities(session, current_user_id)
         
         return communities
     except HTTPException:
@@ -164,13 +190,13 @@ async def get_user_communities_route(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username для проверки
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        # Получаем user_id текущего пользователя для проверки
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Проверяем, что запрашиваемый user_id соответствует текущему пользователю
-        if db_user.user_id != user_id:
+        if current_user_id != user_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
         # Получаем сообщества пользователя
@@ -189,13 +215,11 @@ async def seed_communities(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        # Получаем user_id текущего пользователя
+        user_id = await resolve_user_id(session, user)
+        if not user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user_id = db_user.user_id
-        
         # Данные для создания сообществ
         communities_data = [
             {
@@ -1,7 +1,8 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends, HTTPException
-from ..database.db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from ..database.db import get_db, get_friends_marker
+from ..http_cache import PUBLIC_REVALIDATE, is_not_modified, make_etag, not_modified, set_cache_headers
 from ..database.models.user import User
 from ..database.models.user_data import UserData
 from ..database.models.friendship import Friendship
@@ -10,8 +11,13 @@ router = APIRouter()
 
 
 @router.get('/friends/{user_id}')
-async def get_friends(user_id: int, session: AsyncSession = Depends(get_db)):
+async def get_friends(user_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_db)):
     try:
+        # Маркер учитывает и состав друзей, и версии их профилей
+        etag = make_etag("friends", user_id, await get_friends_marker(session, user_id))
+        if is_not_modified(request, etag):
+            return not_modified(etag, PUBLIC_REVALIDATE)
+
         stmt = (
             select(User, UserData)
             .join(UserData, User.user_id == UserData.user_id, isouter=True)  # ← LEFT JOIN
@@ -35,6 +41,7 @@ async def get_friends(user_id: int, session: AsyncSession = Depends(get_db)):
                 "bio": user_data.bio if user_data else ""
             })
 
+        set_cache_headers(response, etag, PUBLIC_REVALIDATE)
         return {"friends": friends_data}
 
     except Exception as e:
@@ -1,7 +1,7 @@
 from typing import Annotated
 from pydantic import BaseModel
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
@@ -11,22 +11,22 @@ from ..database.models.user_data import UserData
 
 from ..database.db import (
     get_db,
-    get_all_posts,
+    get_posts_page,
     create_post as create_post_db,
     create_user,
     authenticate_user,
-    get_by_username,
     create_comment,
-    get_comments_by_post_id
+    get_comments_page,
+    get_comments_marker,
+    get_password_hash
 )
 
-from ..utils import create_access_token
+from ..database.like_buffer import like_buffer
 
-from ..dependencies import get_current_user, get_current_user_optional
+from ..utils import create_access_token, encode_cursor, decode_cursor
 
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..dependencies import get_current_user, get_current_user_optional, resolve_user_id
+from ..http_cache import PUBLIC_REVALIDATE, is_not_modified, make_etag, not_modified, set_cache_headers
 
 router = APIRouter()
 
@@ -86,6 +86,9 @@ async def sign_up(
             "first_name": user.username
         }
         
+    except HTTPException:
+        # В том числе 503 от password_hasher при переполненной очереди
+        raise
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -141,7 +144,7 @@ async def seed_users(
         created_users = []
 
         for data in users_data:
-            hashed_password = pwd_context.hash(data["password"])
+            hashed_password = await get_password_hash(data["password"])
 
             user = User(
                 username=data["username"],
@@ -180,6 +183,8 @@ async def seed_users(
             "users": created_users
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -191,7 +196,7 @@ async def login_for_access_token(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     user = await authenticate_user(session, username=form_data.username, password=form_data.password)
-    access_token = create_access_token({"sub": user.username})
+    access_token = create_access_token({"sub": user.username, "user_id": user.user_id})
 
     return {
         "access_token": access_token,
@@ -203,12 +208,20 @@ async def login_for_access_token(
 @router.get('/posts')
 async def get_posts(
     session: Annotated[AsyncSession, Depends(get_db)],
-    user: Annotated[dict | None, Depends(get_current_user_optional)] = None
+    user: Annotated[dict | None, Depends(get_current_user_optional)] = None,
+    after: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
 ):
     try:
-        posts = await get_all_posts(session)
+        after_id = decode_cursor(after) if after else None
+        posts, next_after = await get_posts_page(session, after=after_id, limit=limit)
 
-        return posts
+        return {
+            "items": posts,
+            "next_cursor": encode_cursor(next_after) if next_after is not None else None
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -220,16 +233,15 @@ async def create_post(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        user_id = await resolve_user_id(session, user)
+        if not user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Если указан community_id, проверяем, что пользователь подписан на сообщество
         community_id = None
         if post_data.community_id:
             from ..database.db import is_user_subscribed
-            is_subscribed = await is_user_subscribed(session, db_user.user_id, post_data.community_id)
+            is_subscribed = await is_user_subscribed(session, user_id, post_data.community_id)
             if not is_subscribed:
                 raise HTTPException(status_code=403, detail="You must be subscribed to the community to create posts")
             community_id = post_data.community_id
@@ -237,7 +249,7 @@ async def create_post(
         # Создаем пост
         post = await create_post_db(
             session=session,
-            user_id=db_user.user_id if not community_id else None,
+            user_id=user_id if not community_id else None,
             community_id=community_id,
             title=post_data.title,
             content=post_data.content,
@@ -456,14 +468,11 @@ async def create_comment_route(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        # Получаем user_id из username
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        user_id = await resolve_user_id(session, user)
+        if not user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Сохраняем данные пользователя до создания комментария
-        user_id = db_user.user_id
-        username = db_user.username
+        username = user["username"]
         
         # Создаем комментарий
         comment = await create_comment(
@@ -492,11 +501,66 @@ async def create_comment_route(
 @router.get('/posts/{post_id}/comments')
 async def get_comments(
     post_id: int,
+    request: Request,
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
-    user: Annotated[dict | None, Depends(get_current_user_optional)] = None
+    user: Annotated[dict | None, Depends(get_current_user_optional)] = None,
+    before: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
 ):
     try:
-        comments = await get_comments_by_post_id(session, post_id)
-        return comments
+        comments_count = await get_comments_marker(session, post_id)
+        etag = make_etag("comments", post_id, before, limit, comments_count)
+        if is_not_modified(request, etag):
+            return not_modified(etag, PUBLIC_REVALIDATE)
+
+        comments, next_before = await get_comments_page(session, post_id, before=before, limit=limit)
+        set_cache_headers(response, etag, PUBLIC_REVALIDATE)
+        return {
+            "items": comments,
+            "next_before": next_before,
+            "comments_count": comments_count or 0
+        }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/posts/{post_id}/like')
+async def like_post(
+    post_id: int,
+    user: Annotated[get_current_user, Depends()],
+    session: Annotated[AsyncSession, Depends(get_db)]
+):
+    try:
+        user_id = await resolve_user_id(session, user)
+        if not user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # Лайк записывается в БД пачкой вместе с остальными, счётчик обновится при сбросе
+        like_buffer.like(user_id, post_id)
+
+        return {"post_id": post_id, "is_liked": True}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/posts/{post_id}/unlike')
+async def unlike_post(
+    post_id: int,
+    user: Annotated[get_current_user, Depends()],
+    session: Annotated[AsyncSession, Depends(get_db)]
+):
+    try:
+        user_id = await resolve_user_id(session, user)
+        if not user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        like_buffer.unlike(user_id, post_id)
+
+        return {"post_id": post_id, "is_liked": False}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
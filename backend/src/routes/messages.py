@@ -1,27 +1,194 @@
+import asyncio
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from ..database.db import (
+    SessionLocal,
     get_db,
-    get_all_messages
+    get_user_by_id,
+    create_message,
+    get_conversation_page,
+    get_inbox,
+    get_unread_total,
+    mark_conversation_read
 )
+from ..dependencies import get_current_user, resolve_user_id
+from ..services.message_hub import message_hub
+from ..utils import decode_token
 
 
 router = APIRouter()
 
 
-@router.get('/messages')
+class SendMessageRequest(BaseModel):
+    receiver_id: int
+    content: str
+    picture_url: str | None = None
+
+
+@router.get('/messages/{user_id}')
 async def get_messages(
+    user_id: int,
+    user: Annotated[dict, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_db)],
-    id: int
+    before: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 50
+):
+    try:
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # Последняя страница переписки, от новых сообщений к старым
+        messages, next_before = await get_conversation_page(
+            session, current_user_id, user_id, before=before, limit=limit
+        )
+
+        return {
+            "items": messages,
+            "next_before": next_before
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/messages')
+async def send_message(
+    message_data: SendMessageRequest,
+    user: Annotated[dict, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)]
 ):
     try:
-        messages = await get_all_messages(session, id)
-        messages_response = [message.to_pydantic() for message in messages]
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        if message_data.receiver_id == current_user_id:
+            raise HTTPException(status_code=400, detail="Cannot send a message to yourself")
+        if not message_data.content.strip() and not message_data.picture_url:
+            raise HTTPException(status_code=400, detail="Message is empty")
+        if not await get_user_by_id(session, message_data.receiver_id):
+            raise HTTPException(status_code=404, detail="Receiver not found")
 
-        return messages_response
+        return await create_message(
+            session,
+            sender_id=current_user_id,
+            receiver_id=message_data.receiver_id,
+            content=message_data.content.strip(),
+            picture_url=message_data.picture_url or ""
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get('/conversations')
+async def get_conversations(
+    user: Annotated[dict, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    before: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
+):
+    try:
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # Диалоги от свежих к старым, before — last_message_id из next_before
+        conversations, next_before = await get_inbox(session, current_user_id, before=before, limit=limit)
+
+        return {
+            "items": conversations,
+            "next_before": next_before,
+            "unread_total": await get_unread_total(session, current_user_id)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post('/messages/{user_id}/read')
+async def read_messages(
+    user_id: int,
+    user: Annotated[dict, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)]
+):
+    try:
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        await mark_conversation_read(session, current_user_id, user_id)
+        return {"user_id": user_id, "unread_count": 0}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _send_events(websocket: WebSocket, subscription):
+    try:
+        while True:
+            event = await subscription.queue.get()
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+
+async def _receive_until_closed(websocket: WebSocket):
+    # Клиенту нечего присылать, читаем только чтобы заметить закрытие
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket('/ws/messages')
+async def messages_socket(websocket: WebSocket, token: str | None = None):
+    # Браузер не умеет ставить заголовки на WebSocket, поэтому токен приходит в query
+    try:
+        payload = decode_token(token) if token else None
+    except Exception:
+        payload = None
+    if not payload or payload.get("sub") is None:
+        await websocket.close(code=1008)
+        return
+
+    user = {"username": payload["sub"], "user_id": payload.get("user_id")}
+    if user["user_id"] is None:
+        # Сессия нужна только здесь: соединение не держит подключение к базе
+        async with SessionLocal() as session:
+            user["user_id"] = await resolve_user_id(session, user)
+    if not user["user_id"]:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    subscription = message_hub.subscribe(user["user_id"])
+    tasks = [
+        asyncio.create_task(_send_events(websocket, subscription)),
+        asyncio.create_task(_receive_until_closed(websocket)),
+        asyncio.create_task(subscription.overflowed.wait()),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        message_hub.unsubscribe(subscription)
+        for task in tasks:
+            task.cancel()
+
+    for task in done:
+        # Пробрасываем неожиданные ошибки, чтобы они попали в лог сервера
+        task.result()
+    if tasks[2] in done:
+        # Клиент не успевал читать: закрываем с 1013 (try again later), он догрузит историю через GET
+        await websocket.close(code=1013)
@@ -3,15 +3,16 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..database.db import (
     get_db,
-    get_user_data_by_id,
-    get_user_by_id,
-    get_by_username,
+    get_profile_by_id,
+    get_user_cards,
     create_friendship,
     is_friends,
     delete_friendship
 )
-from ..dependencies import get_current_user_optional, get_current_user
-from ..services.user_recommendations.smart_user_selector import SmartUserSelector
+from ..dependencies import get_current_user_optional, get_current_user, resolve_user_id
+from ..database.models.user_data import DEFAULT_AVATAR_URL
+from ..services.user_recommendations.graph_user_service import GraphService
+from ..services.user_recommendations.smart_recommendation_service import SmartRecommendationService
 
 router = APIRouter()
 
@@ -22,69 +23,44 @@ async def get_profile(
     user: Annotated[dict | None, Depends(get_current_user_optional)] = None
 ):
     try:        
-        # Получение данных о пользователе
-        user_data = await get_user_data_by_id(session, user_id)
-        if not user_data:
-            # Можно вернуть только базовые данные, если данных о профиле нет
-            user_data = None
+        # Пользователь и данные профиля одним запросом
+        profile_row = await get_profile_by_id(session, user_id)
+        db_user_by_id, user_data = profile_row if profile_row else (None, None)
+        profile_username = db_user_by_id.username if db_user_by_id else None
 
-        # Определяем, является ли это профиль текущего пользователя
         is_own_profile = False
-        username = None
         is_friend = False
-        
-        # Получаем username из таблицы User для любого профиля (для отображения)
-        db_user_by_id = await get_user_by_id(session, user_id)
-        profile_username = db_user_by_id.username if db_user_by_id else None
-        
-        if user:
-            db_user = await get_by_username(session, user["username"])
-            if db_user:
-                if db_user.user_id == user_id:
-                    is_own_profile = True
-                    username = db_user.username  # Для своего профиля используем username текущего пользователя
-                else:
-                    # Проверяем, являются ли друзьями
-                    is_friend = await is_friends(session, db_user.user_id, user_id)
-        # ДЛЯ НЕАВТОРИЗОВАННЫХ ПОЛЬЗОВАТЕЛЕЙ ИСПОЛЬЗУЕМ username из профиля
-        if not user and db_user_by_id:
-            username = db_user_by_id.username  # ← ДОБАВЬТЕ ЭТУ СТРОКУ!
-
-        # Импортируем дефолтный аватар
-        from ..database.models.user_data import DEFAULT_AVATAR_URL
-        
-        # ДОБАВЛЯЕМ РЕКОМЕНДОВАННЫХ ДРУЗЕЙ
+        current_user_id = await resolve_user_id(session, user)
+        graph_service = GraphService(session)
+
         recommendations = []
-        if user and not is_own_profile:
-            # Получаем рекомендации для текущего пользователя
-            current_user_id = db_user.user_id
-
-            friends_ids = []  # ID друзей друзей
-            likes_ids = []  # ID из лайков
-            tags_ids = []  # ID по тегам
-            combined_ids = []  # Комбинированный список
-
-            selected_ids = SmartUserSelector.pick_top(
-                friends=friends_ids,
-                likes=likes_ids,
-                tags=tags_ids,
-                combined=combined_ids,
-                top_n=15
-            )
-
-            for rec_user_id in selected_ids:
-                rec_user_data = await get_user_data_by_id(session, rec_user_id)
-                rec_db_user = await get_user_by_id(session, rec_user_id)
-
-                if rec_user_data and rec_db_user:
-                    recommendations.append({
-                        "user_id": rec_user_id,
-                        "first_name": rec_user_data.first_name,
-                        "last_name": rec_user_data.last_name,
-                        "avatar": rec_user_data.avatar_url,
-                        "username": rec_db_user.username,
-                        "is_friend": await is_friends(session, current_user_id, rec_user_id)
-                    })
+        mutual_friends_count = 0
+        if current_user_id:
+            if current_user_id == user_id:
+                is_own_profile = True
+            else:
+                # Друзья текущего пользователя — один раз для профиля и всех карточек
+                my_friends = set(await graph_service.get_friends(current_user_id))
+                is_friend = user_id in my_friends
+
+                # ДОБАВЛЯЕМ РЕКОМЕНДОВАННЫХ ДРУЗЕЙ
+                selected_ids = await SmartRecommendationService(session).get_top(current_user_id, top_n=15)
+
+                # Общие друзья с владельцем профиля и со всеми рекомендованными — одним пакетом
+                mutual_counts = await graph_service.count_mutual_friends(
+                    current_user_id, [user_id, *selected_ids]
+                )
+                mutual_friends_count = mutual_counts.get(user_id, 0)
+
+                cards = await get_user_cards(session, selected_ids)
+                for rec_user_id in selected_ids:
+                    card = cards.get(rec_user_id)
+                    if card:
+                        recommendations.append({
+                            **card,
+                            "is_friend": rec_user_id in my_friends,
+                            "mutual_friends_count": mutual_counts.get(rec_user_id, 0)
+                        })
 
         # Формируем ответ
         profile = {
@@ -93,8 +69,9 @@ async def get_profile(
             "avatar": user_data.avatar_url if user_data and user_data.avatar_url else DEFAULT_AVATAR_URL,
             "bio": user_data.bio if user_data else "",
             "is_own_profile": is_own_profile,
-            "username": username if is_own_profile else profile_username,
+            "username": user["username"] if is_own_profile else profile_username,
             "is_friend": is_friend,
+            "mutual_friends_count": mutual_friends_count,
             "posts": [],
             "recommendations": recommendations
         }
@@ -105,6 +82,30 @@ async def get_profile(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get('/profile/{user_id}/mutual-friends')
+async def get_mutual_friends(
+    user_id: int,
+    user: Annotated[dict, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_db)
+):
+    try:
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        mutual_ids = await GraphService(session).get_mutual_friends(current_user_id, user_id)
+        cards = await get_user_cards(session, mutual_ids)
+
+        return {
+            "count": len(mutual_ids),
+            "friends": [cards[uid] for uid in mutual_ids if uid in cards]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post('/profile/{user_id}/add-friend')
 async def add_friend(
     user_id: int,
@@ -113,20 +114,20 @@ async def add_friend(
 ):
     try:
         # Получаем текущего пользователя
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Нельзя добавить себя в друзья
-        if db_user.user_id == user_id:
+        if current_user_id == user_id:
             raise HTTPException(status_code=400, detail="Cannot add yourself as a friend")
         
         # Проверяем, не друзья ли уже
-        if await is_friends(session, db_user.user_id, user_id):
+        if await is_friends(session, current_user_id, user_id):
             return {"message": "Already friends", "is_friend": True}
         
         # Создаем дружбу
-        await create_friendship(session, db_user.user_id, user_id)
+        await create_friendship(session, current_user_id, user_id)
         
         return {"message": "Friend added successfully", "is_friend": True}
     except HTTPException:
@@ -143,12 +144,12 @@ async def remove_friend(
 ):
     try:
         # Получаем текущего пользователя
-        db_user = await get_by_username(session, user["username"])
-        if not db_user:
+        current_user_id = await resolve_user_id(session, user)
+        if not current_user_id:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Удаляем дружбу
-        success = await delete_friendship(session, db_user.user_id, user_id)
+        success = await delete_friendship(session, current_user_id, user_id)
         if not success:
             return {"message": "Not friends", "is_friend": False}
         
@@ -0,0 +1,154 @@
+"""
+Пакетный расчёт рекомендаций для всех пользователей.
+
+Лайки, теги постов и дружба загружаются в разреженные матрицы, оценки всех
+источников считаются матричными произведениями по блокам пользователей,
+порядок пользователей собирается теми же селекторами, что и в онлайн-сервисах.
+Посты сохраняются списками-источниками: порядок ленты из них собирает онлайн-сервис.
+Требует numpy и scipy (extra "batch").
+"""
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import text
+
+from .post_recommendations.combined_post_recommendations_service import CombinedPostRecommendationService
+from .user_recommendations.combined_user_service import CombinedUserRecommendationService
+from .user_recommendations.smart_user_selector import SmartUserSelector
+from .precomputed_recommendations import (
+    POST_KINDS, POSTS_BY_LIKES, POSTS_BY_TAGS, POSTS_COMBINED, USERS, replace_precomputed
+)
+
+
+async def _fetch_pairs(session, query: str):
+    result = await session.execute(text(query))
+    rows = result.fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.array(rows, dtype=np.int64)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _matrix(row_ids, col_ids, row_universe, col_universe):
+    rows = np.searchsorted(row_universe, row_ids)
+    cols = np.searchsorted(col_universe, col_ids)
+    data = np.ones(len(rows), dtype=np.int32)
+    return sp.csr_matrix((data, (rows, cols)), shape=(len(row_universe), len(col_universe)))
+
+
+def _drop(scores, mask):
+    """Обнуляет в scores позиции, где mask ненулевая"""
+    scores = scores - scores.multiply(mask.astype(bool))
+    scores = sp.csr_matrix(scores)
+    scores.eliminate_zeros()
+    return scores
+
+
+def _drop_self(scores, offset: int):
+    """Обнуляет оценку пользователя самому себе: строка row соответствует столбцу offset + row"""
+    rows = np.arange(scores.shape[0])
+    mask = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, rows + offset)),
+        shape=scores.shape
+    )
+    return _drop(scores, mask)
+
+
+def _top_row(scores, row: int, top_n: int, universe):
+    """top_n пар (id, score) строки по убыванию score, как Counter.most_common"""
+    start, end = scores.indptr[row], scores.indptr[row + 1]
+    cols = scores.indices[start:end]
+    vals = scores.data[start:end]
+    if len(vals) > top_n:
+        part = np.argpartition(-vals, top_n)[:top_n]
+        cols, vals = cols[part], vals[part]
+    order = np.lexsort((cols, -vals))
+    return [(int(universe[c]), int(v)) for c, v in zip(cols[order], vals[order])]
+
+
+class BatchRecommendationJob:
+    def __init__(self, session, post_top_n: int = 10, user_top_n: int = 15, chunk_size: int = 2048):
+        self.session = session
+        self.post_top_n = post_top_n
+        self.user_top_n = user_top_n
+        self.chunk_size = chunk_size
+
+    async def load(self):
+        like_users, like_posts = await _fetch_pairs(self.session, "SELECT user_id, post_id FROM likes")
+        tag_posts, tag_ids = await _fetch_pairs(self.session, "SELECT post_id, tag_id FROM post_tags")
+        friend_users, friend_ids = await _fetch_pairs(self.session, "SELECT user_id, friend_id FROM friendship")
+
+        self.users = np.unique(np.concatenate([like_users, friend_users, friend_ids]))
+        self.posts = np.unique(np.concatenate([like_posts, tag_posts]))
+        self.tags = np.unique(tag_ids)
+
+        # пользователи × посты, посты × теги, пользователи × пользователи
+        self.likes = _matrix(like_users, like_posts, self.users, self.posts)
+        self.post_tags = _matrix(tag_posts, tag_ids, self.posts, self.tags)
+        self.friends = _matrix(friend_users, friend_ids, self.users, self.users)
+
+        # пост × пост: сколько пользователей лайкнули оба поста
+        self.co_likes = (self.likes.T @ self.likes).tocsr()
+        # пользователь × тег: сколько лайкнутых постов пользователя помечены тегом
+        self.user_tags = (self.likes @ self.post_tags).tocsr()
+
+    def _score_chunk(self, start: int, end: int):
+        likes = self.likes[start:end]
+        liked_tags = (self.user_tags[start:end] > 0).astype(np.int32)
+        friends = self.friends[start:end]
+
+        post_scores = {
+            "likes": _drop(likes @ self.co_likes, likes),
+            "tags": _drop(liked_tags @ self.post_tags.T, likes),
+        }
+        user_scores = {
+            "friends": _drop_self(_drop(friends @ self.friends, friends), start),
+            "likes": _drop_self(likes @ self.likes.T, start),
+            "tags": _drop_self(liked_tags @ self.user_tags.T, start),
+        }
+
+        return post_scores, user_scores
+
+    def compute(self):
+        """
+        Возвращает строки (user_id, rank, item_id): посты по видам-источникам
+        (kind -> строки), пользователей сразу итоговым порядком.
+        """
+        post_rows = {kind: [] for kind in POST_KINDS}
+        user_rows = []
+
+        for start in range(0, len(self.users), self.chunk_size):
+            end = min(start + self.chunk_size, len(self.users))
+            post_scores, user_scores = self._score_chunk(start, end)
+
+            for row in range(end - start):
+                user_id = int(self.users[start + row])
+
+                by_likes = _top_row(post_scores["likes"], row, self.post_top_n, self.posts)
+                by_tags = _top_row(post_scores["tags"], row, self.post_top_n, self.posts)
+                combined = CombinedPostRecommendationService.combine(by_likes, by_tags, top_n=self.post_top_n)
+                for kind, posts in ((POSTS_BY_LIKES, by_likes), (POSTS_BY_TAGS, by_tags), (POSTS_COMBINED, combined)):
+                    post_rows[kind].extend((user_id, rank, pid) for rank, (pid, _) in enumerate(posts))
+
+                friends = _top_row(user_scores["friends"], row, self.user_top_n, self.users)
+                likes = _top_row(user_scores["likes"], row, self.user_top_n, self.users)
+                tags = _top_row(user_scores["tags"], row, self.user_top_n, self.users)
+                combined = CombinedUserRecommendationService.combine(friends, likes, tags, top_n=self.user_top_n)
+                top_users = SmartUserSelector.pick_top(
+                    friends=[uid for uid, _ in friends],
+                    likes=[uid for uid, _ in likes],
+                    tags=[uid for uid, _ in tags],
+                    combined=[uid for uid, _ in combined],
+                    top_n=self.user_top_n
+                )
+                user_rows.extend((user_id, rank, uid) for rank, uid in enumerate(top_users))
+
+        return post_rows, user_rows
+
+    async def run(self):
+        await self.load()
+        post_rows, user_rows = self.compute()
+        for kind, rows in post_rows.items():
+            await replace_precomputed(self.session, kind, rows)
+        await replace_precomputed(self.session, USERS, user_rows)
+
+        return sum(len(rows) for rows in post_rows.values()), len(user_rows)
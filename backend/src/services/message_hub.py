@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from ..config import REALTIME_QUEUE_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Очередь событий одного WebSocket-соединения"""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        # Выставляется, если клиент не успевает забирать события
+        self.overflowed = asyncio.Event()
+
+
+class MessageHub:
+    """
+    Раздача новых сообщений подключённым клиентам внутри процесса.
+    У каждого соединения своя ограниченная очередь: если клиент читает медленнее,
+    чем ему пишут, соединение закрывается, и он догружает пропущенное через REST.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions = {}  # user_id -> set(Subscription), у пользователя может быть несколько вкладок
+        self.overflows = 0
+
+    @property
+    def connections(self):
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+    def subscribe(self, user_id: int):
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subs = self._subscriptions.get(subscription.user_id)
+        if subs is None:
+            return
+        subs.discard(subscription)
+        if not subs:
+            del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, event: dict):
+        for subscription in self._subscriptions.get(user_id, ()):
+            if subscription.overflowed.is_set():
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.overflows += 1
+                subscription.overflowed.set()
+                logger.warning("Realtime queue of user %s is full, dropping the connection", user_id)
+
+    async def on_message_created(self, session, message: dict):
+        event = {"type": "message", "message": message}
+        self.publish(message["receiver_id"], event)
+        # Отправителю тоже: его другие вкладки должны увидеть своё сообщение
+        self.publish(message["sender_id"], event)
+
+
+message_hub = MessageHub(REALTIME_QUEUE_SIZE)
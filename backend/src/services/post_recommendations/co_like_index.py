@@ -0,0 +1,132 @@
+import heapq
+import logging
+from operator import itemgetter
+
+from sqlalchemy import text
+
+from ...config import CO_LIKE_NEIGHBORS
+
+
+logger = logging.getLogger(__name__)
+
+class CoLikeIndex:
+    """
+    Индекс "пост -> посты, которые лайкали те же пользователи".
+    Строится в фоне после старта (пока не готов, рекомендации считаются в SQL)
+    и дальше обновляется по событиям лайков.
+    Для каждого поста хранится не более 2 * neighbors соседей: запас нужен,
+    чтобы инкрементальные обновления могли поднять нового соседа в топ.
+    """
+
+    def __init__(self, neighbors: int):
+        self.neighbors = neighbors
+        self.capacity = neighbors * 2
+        self._index = {}  # post_id -> {neighbor_post_id: score}
+        self.ready = False
+        # Пока идёт перестроение: (post_id, neighbor_id) -> изменение счёта от лайков за это время
+        self._pending = None
+
+    async def rebuild(self, session):
+        # Запрос по всей таблице likes долгий: лайки, применённые за это время, копятся в _pending
+        # и докатываются на готовый индекс. Пачка, закоммиченная до начала запроса, но сообщённая
+        # после начала перестроения, может посчитаться дважды — для топа соседей это не важно
+        self._pending = {}
+        try:
+            result = await session.execute(
+                text("""
+                    SELECT post_id, neighbor_id, score FROM (
+                        SELECT a.post_id, b.post_id AS neighbor_id, COUNT(*) AS score,
+                               ROW_NUMBER() OVER (
+                                   PARTITION BY a.post_id ORDER BY COUNT(*) DESC, b.post_id
+                               ) AS rn
+                        FROM likes a
+                        JOIN likes b ON a.user_id = b.user_id AND a.post_id != b.post_id
+                        GROUP BY a.post_id, b.post_id
+                    ) ranked
+                    WHERE rn <= :k
+                """),
+                {"k": self.capacity}
+            )
+        except BaseException:
+            self._pending = None
+            raise
+
+        index = {}
+        for post_id, neighbor_id, score in result:
+            index.setdefault(post_id, {})[neighbor_id] = score
+
+        pending, self._pending = self._pending, None
+        self._index = index
+        for (post_id, neighbor_id), delta in pending.items():
+            if delta:
+                self._bump(post_id, neighbor_id, delta)
+        self.ready = True
+
+    async def rebuild_in_background(self, sessionmaker):
+        """Перестроение при старте приложения, запускается отдельной задачей"""
+        try:
+            async with sessionmaker() as session:
+                await self.rebuild(session)
+        except Exception:
+            logger.exception("Co-like index rebuild failed, like recommendations stay on SQL")
+
+    def neighbors_of(self, post_id: int):
+        neighbors = self._index.get(post_id)
+        if not neighbors:
+            return []
+        return heapq.nlargest(self.neighbors, neighbors.items(), key=itemgetter(1))
+
+    def _bump(self, post_id: int, neighbor_id: int, delta: int):
+        neighbors = self._index.setdefault(post_id, {})
+        if neighbor_id in neighbors:
+            neighbors[neighbor_id] += delta
+            if neighbors[neighbor_id] <= 0:
+                del neighbors[neighbor_id]
+        elif delta > 0:
+            neighbors[neighbor_id] = delta
+            if len(neighbors) > self.capacity:
+                weakest = min(neighbors.items(), key=itemgetter(1))[0]
+                del neighbors[weakest]
+
+    def _apply(self, post_id: int, neighbor_id: int, delta: int):
+        if self._pending is not None:
+            key = (post_id, neighbor_id)
+            self._pending[key] = self._pending.get(key, 0) + delta
+        if self.ready:
+            self._bump(post_id, neighbor_id, delta)
+
+    async def on_likes_changed(self, session, added, removed):
+        """Обновляет соседей по пачке применённых лайков (вызывается из LikeWriteBuffer)"""
+        if not (self.ready or self._pending is not None) or not (added or removed):
+            return
+
+        user_ids = list({uid for uid, _ in added} | {uid for uid, _ in removed})
+        result = await session.execute(
+            text("SELECT user_id, post_id FROM likes WHERE user_id = ANY(:uids)"),
+            {"uids": user_ids}
+        )
+        liked = {uid: set() for uid in user_ids}
+        for uid, post_id in result:
+            liked[uid].add(post_id)
+
+        # Восстанавливаем состояние до пачки и проигрываем изменения по одному,
+        # чтобы пары постов из одной пачки не посчитались дважды
+        for uid, post_id in added:
+            liked[uid].discard(post_id)
+        for uid, post_id in removed:
+            liked[uid].add(post_id)
+
+        for uid, post_id in removed:
+            liked[uid].discard(post_id)
+            for other in liked[uid]:
+                self._apply(post_id, other, -1)
+                self._apply(other, post_id, -1)
+
+        for uid, post_id in added:
+            for other in liked[uid]:
+                self._apply(post_id, other, 1)
+                self._apply(other, post_id, 1)
+            liked[uid].add(post_id)
+
+
+co_like_index = CoLikeIndex(CO_LIKE_NEIGHBORS)
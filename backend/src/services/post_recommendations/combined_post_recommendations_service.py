@@ -12,6 +12,11 @@ class CombinedPostRecommendationService:
         likes_scores = await self.like_service.recommend_posts(user_id, top_n=top_n)
         tags_scores = await self.tag_service.recommend_posts(user_id, top_n=top_n)
 
+        return self.combine(likes_scores, tags_scores, top_n=top_n)
+
+    @staticmethod
+    def combine(likes_scores, tags_scores, top_n=10):
+        """Смешивает уже посчитанные оценки по лайкам и тегам"""
         combined = Counter()
         for post_id, score in likes_scores:
             combined[post_id] += score * 2
@@ -1,9 +1,14 @@
 from collections import Counter
 from sqlalchemy import text
 
+from ...config import RECOMMENDATION_SQL_AGGREGATION
+from .co_like_index import co_like_index
+
 class LikePostRecommendationService:
-    def __init__(self, session):
+    def __init__(self, session, index=co_like_index, aggregate_in_sql=RECOMMENDATION_SQL_AGGREGATION):
         self.session = session
+        self.index = index
+        self.aggregate_in_sql = aggregate_in_sql
 
     async def recommend_posts(self, user_id, top_n=10):
         """
@@ -20,18 +25,51 @@ class LikePostRecommendationService:
         if not liked_posts:
             return []
 
-        # 2. Другие пользователи, которые лайкнули те же посты
+        if not self.index.ready:
+            return await self._recommend_from_likes(user_id, liked_posts, top_n)
+
+        # 2. Сливаем заранее посчитанные списки соседей лайкнутых постов
+        liked = set(liked_posts)
+        counter = Counter()
+        for post_id in liked_posts:
+            for neighbor_id, score in self.index.neighbors_of(post_id):
+                if neighbor_id not in liked:
+                    counter[neighbor_id] += score
+
+        # 3. Возвращаем топ-N постов
+        return counter.most_common(top_n)
+
+    async def _recommend_from_likes(self, user_id, liked_posts, top_n):
+        # Без индекса считаем соседей напрямую по таблице лайков
+        if self.aggregate_in_sql:
+            result = await self.session.execute(
+                text("""
+                    SELECT b.post_id, COUNT(*) AS score
+                    FROM likes a
+                    JOIN likes b ON a.user_id = b.user_id
+                    WHERE a.post_id = ANY(:posts) AND a.user_id != :uid
+                      AND b.post_id != ALL(:posts)
+                    GROUP BY b.post_id
+                    ORDER BY score DESC, b.post_id
+                    LIMIT :top_n
+                """),
+                {"posts": liked_posts, "uid": user_id, "top_n": top_n}
+            )
+            return [(post_id, score) for post_id, score in result]
+
         result = await self.session.execute(
             text("""
-                SELECT post_id, user_id FROM likes
-                WHERE post_id = ANY(:posts) AND user_id != :uid
+                SELECT b.post_id
+                FROM likes a
+                JOIN likes b ON a.user_id = b.user_id
+                WHERE a.post_id = ANY(:posts) AND a.user_id != :uid
+                  AND b.post_id != ALL(:posts)
             """),
             {"posts": liked_posts, "uid": user_id}
         )
 
         counter = Counter()
-        for post_id, other_user in result:
+        for (post_id,) in result:
             counter[post_id] += 1  # увеличиваем score поста по числу пересечений
 
-        # 3. Возвращаем топ-N постов
         return counter.most_common(top_n)
@@ -3,25 +3,53 @@ from .like_post_service import LikePostRecommendationService
 from .tag_post_service import TagPostRecommendationService
 from .combined_post_recommendations_service import CombinedPostRecommendationService
 from .smart_post_selector import SmartPostSelector
+from ..recommendation_cache import recommendation_cache
+from ..precomputed_recommendations import get_precomputed_posts
 
 class SmartPostRecommendationService:
-    def __init__(self, session):
+    def __init__(self, session, cache=recommendation_cache):
         self.session = session
+        self.cache = cache
         self.like_service = LikePostRecommendationService(session)
         self.tag_service = TagPostRecommendationService(session)
         self.combined_service = CombinedPostRecommendationService(session)
 
-    async def get_all_ordered(self, user_id: int, limit: int = None):
-        # Получаем рекомендации с оценками
+    async def _collect_candidates(self, user_id: int):
+        """
+        Запрашивает источники кандидатов по одному разу за вызов,
+        комбинированный список собирается из тех же оценок без повторных запросов.
+        Если есть результат ночного пересчёта (precompute.py), берутся его списки:
+        порядок из них дальше собирается тем же кодом, что и из онлайн-кандидатов.
+        """
+        cached = self.cache.get(user_id, "posts")
+        if cached is not None:
+            return cached
+
+        precomputed = await get_precomputed_posts(self.session, user_id)
+        if precomputed is not None:
+            self.cache.set(user_id, "posts", precomputed)
+            return precomputed
+
         posts_by_likes_with_scores = await self.like_service.recommend_posts(user_id)
         posts_by_tags_with_scores = await self.tag_service.recommend_posts(user_id)
-        combined_posts_with_scores = await self.combined_service.recommend_posts(user_id)
+        combined_posts_with_scores = self.combined_service.combine(
+            posts_by_likes_with_scores,
+            posts_by_tags_with_scores
+        )
 
         # Оставляем только id
         posts_by_likes = [pid for pid, _ in posts_by_likes_with_scores]
         posts_by_tags = [pid for pid, _ in posts_by_tags_with_scores]
         combined_posts = [pid for pid, _ in combined_posts_with_scores]
 
+        candidates = (posts_by_likes, posts_by_tags, combined_posts)
+        self.cache.set(user_id, "posts", candidates)
+
+        return candidates
+
+    async def get_all_ordered(self, user_id: int, limit: int = None):
+        posts_by_likes, posts_by_tags, combined_posts = await self._collect_candidates(user_id)
+
         # Сортируем по релевантности
         return SmartPostSelector.order_all(
             posts_by_likes=posts_by_likes,
@@ -36,15 +64,7 @@ class SmartPostRecommendationService:
         комбинированные → лайки → теги, без повторов, батчами.
         Ограничение общего количества постов через параметр `limit`.
         """
-        # Получаем рекомендации с оценками
-        posts_by_likes_with_scores = await self.like_service.recommend_posts(user_id)
-        posts_by_tags_with_scores = await self.tag_service.recommend_posts(user_id)
-        combined_posts_with_scores = await self.combined_service.recommend_posts(user_id)
-
-        # Оставляем только id
-        posts_by_likes = [pid for pid, _ in posts_by_likes_with_scores]
-        posts_by_tags = [pid for pid, _ in posts_by_tags_with_scores]
-        combined_posts = [pid for pid, _ in combined_posts_with_scores]
+        posts_by_likes, posts_by_tags, combined_posts = await self._collect_candidates(user_id)
 
         used = set()
         total_yielded = 0
@@ -1,14 +1,42 @@
 from collections import Counter
 from sqlalchemy import text
 
+from ...config import RECOMMENDATION_SQL_AGGREGATION
+
 class TagPostRecommendationService:
-    def __init__(self, session):
+    def __init__(self, session, aggregate_in_sql=RECOMMENDATION_SQL_AGGREGATION):
         self.session = session
+        self.aggregate_in_sql = aggregate_in_sql
 
     async def recommend_posts(self, user_id, top_n=10):
         """
         Рекомендует посты на основе тегов постов, которые лайкнул пользователь
         """
+        if not self.aggregate_in_sql:
+            return await self._recommend_in_python(user_id, top_n)
+
+        # score = сколько тегов совпало, считается в БД, наружу уходит только топ-N
+        result = await self.session.execute(
+            text("""
+                SELECT pt.post_id, COUNT(*) AS score
+                FROM post_tags pt
+                WHERE pt.tag_id IN (
+                    SELECT lpt.tag_id
+                    FROM likes l
+                    JOIN post_tags lpt ON l.post_id = lpt.post_id
+                    WHERE l.user_id = :uid
+                ) AND NOT EXISTS (
+                    SELECT 1 FROM likes l WHERE l.user_id = :uid AND l.post_id = pt.post_id
+                )
+                GROUP BY pt.post_id
+                ORDER BY score DESC, pt.post_id
+                LIMIT :top_n
+            """),
+            {"uid": user_id, "top_n": top_n}
+        )
+        return [(post_id, score) for post_id, score in result]
+
+    async def _recommend_in_python(self, user_id, top_n):
         # теги постов, которые лайкнул пользователь
         result = await self.session.execute(
             text("""
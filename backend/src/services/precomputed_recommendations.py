@@ -0,0 +1,89 @@
+from sqlalchemy import text
+
+
+# Посты хранятся по источникам кандидатов, а не итоговым порядком:
+# онлайн-сервис сам собирает из них порядок, как из только что посчитанных списков
+POSTS_BY_LIKES = "posts_likes"
+POSTS_BY_TAGS = "posts_tags"
+POSTS_COMBINED = "posts_combined"
+POST_KINDS = (POSTS_BY_LIKES, POSTS_BY_TAGS, POSTS_COMBINED)
+USERS = "users"
+
+_STALE_POST = "EXISTS (SELECT 1 FROM likes l WHERE l.user_id = r.user_id AND l.post_id = r.item_id)"
+
+# Пересчёт идёт раз в сутки, а лайки и друзья меняются сразу:
+# уже лайкнутые посты и уже добавленных друзей отбрасываем при чтении (поиск по первичному ключу)
+_STALE = {
+    **{kind: _STALE_POST for kind in POST_KINDS},
+    USERS: "EXISTS (SELECT 1 FROM friendship f WHERE f.user_id = r.user_id AND f.friend_id = r.item_id)",
+}
+
+
+async def get_precomputed(session, user_id: int, kind: str):
+    """Заранее посчитанные рекомендации пользователя по порядку или None, если их нет"""
+    result = await session.execute(
+        text(f"""
+            SELECT r.item_id FROM recommendations r
+            WHERE r.user_id = :uid AND r.kind = :kind AND NOT {_STALE[kind]}
+            ORDER BY r.rank
+        """),
+        {"uid": user_id, "kind": kind}
+    )
+    items = [r[0] for r in result]
+
+    return items or None
+
+
+async def get_precomputed_posts(session, user_id: int):
+    """
+    Заранее посчитанные кандидаты постов (по лайкам, по тегам, комбинированные)
+    одним запросом или None, если пересчёт пользователя не содержит.
+    """
+    result = await session.execute(
+        text(f"""
+            SELECT r.kind, r.item_id FROM recommendations r
+            WHERE r.user_id = :uid AND r.kind IN (:likes, :tags, :combined) AND NOT {_STALE_POST}
+            ORDER BY r.kind, r.rank
+        """),
+        {"uid": user_id, "likes": POSTS_BY_LIKES, "tags": POSTS_BY_TAGS, "combined": POSTS_COMBINED}
+    )
+    by_kind = {kind: [] for kind in POST_KINDS}
+    for kind, item_id in result:
+        by_kind[kind].append(item_id)
+
+    if not any(by_kind.values()):
+        return None
+    return tuple(by_kind[kind] for kind in POST_KINDS)
+
+
+async def replace_precomputed(session, kind: str, rows, chunk_size: int = 50000):
+    """
+    Заменяет все рекомендации вида kind одной транзакцией.
+    rows — список (user_id, rank, item_id).
+    """
+    await session.execute(
+        text("DELETE FROM recommendations WHERE kind = :kind"),
+        {"kind": kind}
+    )
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        await session.execute(
+            text("""
+                INSERT INTO recommendations (user_id, kind, rank, item_id)
+                SELECT d.user_id, :kind, d.rank, d.item_id
+                FROM unnest(
+                    CAST(:uids AS integer[]),
+                    CAST(:ranks AS integer[]),
+                    CAST(:items AS integer[])
+                ) AS d(user_id, rank, item_id)
+            """),
+            {
+                "kind": kind,
+                "uids": [row[0] for row in chunk],
+                "ranks": [row[1] for row in chunk],
+                "items": [row[2] for row in chunk],
+            }
+        )
+
+    await session.commit()
@@ -0,0 +1,60 @@
+import time
+
+from sqlalchemy import text
+
+from ..cache import LRUCache
+from ..config import RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL
+
+
+class RecommendationCache:
+    """
+    Кэш готовых рекомендаций по пользователям.
+    Записи живут не дольше ttl секунд и сбрасываются раньше,
+    когда меняются лайки пользователя или граф дружбы вокруг него.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.ttl = ttl
+        self._users = LRUCache(maxsize)  # user_id -> {key: (value, expires_at)}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, user_id: int, key):
+        entries = self._users.get(user_id)
+        entry = entries.get(key) if entries else None
+        if entry is None or entry[1] <= time.time():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[0]
+
+    def set(self, user_id: int, key, value):
+        entries = self._users.get(user_id)
+        if entries is None:
+            entries = {}
+            self._users.set(user_id, entries)
+        entries[key] = (value, time.time() + self.ttl)
+
+    def invalidate(self, *user_ids: int):
+        for user_id in user_ids:
+            self._users.pop(user_id)
+
+    async def on_likes_changed(self, session, added, removed):
+        self.invalidate(*{uid for uid, _ in added}, *{uid for uid, _ in removed})
+
+    async def on_friendship_changed(self, session, user_id: int, friend_id: int, created: bool):
+        # Друзья-друзей меняются и у тех, у кого user_id в друзьях
+        result = await session.execute(
+            text("SELECT user_id FROM friendship WHERE friend_id = :uid"),
+            {"uid": user_id}
+        )
+        self.invalidate(user_id, friend_id, *(r[0] for r in result))
+
+
+recommendation_cache = RecommendationCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL)
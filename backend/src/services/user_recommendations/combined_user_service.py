@@ -28,6 +28,11 @@ class CombinedUserRecommendationService:
         # рекомендации пользователей по тегам
         tags_scores = await tag_service.recommend_by_tags(user_id)
 
+        return self.combine(friends_scores, likes_scores, tags_scores, top_n=top_n)
+
+    @staticmethod
+    def combine(friends_scores, likes_scores, tags_scores, top_n=15):
+        """Смешивает уже посчитанные оценки из всех источников"""
         # объединяем с весами (например: друзья ×2, лайки ×1, теги ×1)
         combined = Counter()
         for uid, score in friends_scores:
@@ -0,0 +1,140 @@
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import text
+
+from ...config import FRIENDSHIP_GRAPH_COMPACT_THRESHOLD
+
+
+class FriendshipGraph:
+    """
+    Граф дружбы в памяти в формате CSR: друзья пользователя из строки row
+    лежат в neighbors[offsets[row]:offsets[row + 1]], отсортированные по id.
+    Изменения после загрузки копятся в небольших наборах added/removed
+    и вливаются в массивы, когда их становится больше compact_threshold.
+    """
+
+    def __init__(self, compact_threshold: int):
+        self.compact_threshold = compact_threshold
+        self._rows = {}  # user_id -> номер строки
+        self._offsets = array("q", [0])
+        self._neighbors = array("q")
+        self._added = {}  # user_id -> друзья, которых ещё нет в массивах
+        self._removed = {}  # user_id -> друзья, удалённые из массивов
+        self._pending = 0
+        self.ready = False
+
+    async def load(self, session):
+        result = await session.execute(
+            text("SELECT user_id, friend_id FROM friendship ORDER BY user_id, friend_id")
+        )
+        self._build(result)
+        self.ready = True
+
+    def _build(self, edges):
+        """edges — пары (user_id, friend_id), отсортированные по user_id и friend_id"""
+        rows = {}
+        offsets = array("q", [0])
+        neighbors = array("q")
+
+        current = None
+        for user_id, friend_id in edges:
+            if user_id != current:
+                if current is not None:
+                    offsets.append(len(neighbors))
+                rows[user_id] = len(rows)
+                current = user_id
+            neighbors.append(friend_id)
+        if current is not None:
+            offsets.append(len(neighbors))
+
+        self._rows = rows
+        self._offsets = offsets
+        self._neighbors = neighbors
+        self._added = {}
+        self._removed = {}
+        self._pending = 0
+
+    def _base(self, user_id: int):
+        row = self._rows.get(user_id)
+        if row is None:
+            return array("q")
+        return self._neighbors[self._offsets[row]:self._offsets[row + 1]]
+
+    def _in_base(self, user_id: int, friend_id: int):
+        base = self._base(user_id)
+        pos = bisect_left(base, friend_id)
+        return pos < len(base) and base[pos] == friend_id
+
+    def friends(self, user_id: int):
+        base = self._base(user_id)
+        added = self._added.get(user_id)
+        removed = self._removed.get(user_id)
+        if not added and not removed:
+            return base.tolist()
+
+        friends = [f for f in base if not removed or f not in removed]
+        if added:
+            friends.extend(added)
+        return friends
+
+    def friends_of_friends(self, user_id: int):
+        """Друзья друзей с повторами (по одному на каждый путь), как в SQL-версии"""
+        return [
+            fof
+            for friend_id in self.friends(user_id)
+            for fof in self.friends(friend_id)
+            if fof != user_id
+        ]
+
+    def mutual_friends(self, user_id: int, other_id: int):
+        mine = set(self.friends(user_id))
+        return [f for f in self.friends(other_id) if f in mine]
+
+    def count_mutual_friends(self, user_id: int, others):
+        """Число общих друзей user_id с каждым из others; друзья user_id собираются один раз"""
+        mine = set(self.friends(user_id))
+        return {
+            other_id: sum(1 for f in self.friends(other_id) if f in mine)
+            for other_id in others
+        }
+
+    def add(self, user_id: int, friend_id: int):
+        removed = self._removed.get(user_id)
+        if removed and friend_id in removed:
+            removed.discard(friend_id)
+        elif not self._in_base(user_id, friend_id):
+            self._added.setdefault(user_id, set()).add(friend_id)
+        self._changed()
+
+    def remove(self, user_id: int, friend_id: int):
+        added = self._added.get(user_id)
+        if added and friend_id in added:
+            added.discard(friend_id)
+        elif self._in_base(user_id, friend_id):
+            self._removed.setdefault(user_id, set()).add(friend_id)
+        self._changed()
+
+    def _changed(self):
+        self._pending += 1
+        if self._pending >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        users = set(self._rows) | set(self._added)
+        self._build(
+            (user_id, friend_id)
+            for user_id in sorted(users)
+            for friend_id in sorted(self.friends(user_id))
+        )
+
+    async def on_friendship_changed(self, session, user_id: int, friend_id: int, created: bool):
+        if not self.ready:
+            return
+        if created:
+            self.add(user_id, friend_id)
+        else:
+            self.remove(user_id, friend_id)
+
+
+friendship_graph = FriendshipGraph(FRIENDSHIP_GRAPH_COMPACT_THRESHOLD)
@@ -1,11 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from .friendship_graph import friendship_graph
+
 class GraphService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, graph=friendship_graph):
         self.session = session
+        self.graph = graph
 
     async def get_friends(self, user_id: int):
+        if self.graph.ready:
+            return self.graph.friends(user_id)
+
         result = await self.session.execute(
             text("""
                 SELECT friend_id FROM friendship WHERE user_id = :uid
@@ -15,6 +21,9 @@ class GraphService:
         return [r[0] for r in result]
 
     async def get_friends_of_friends(self, user_id: int):
+        if self.graph.ready:
+            return self.graph.friends_of_friends(user_id)
+
         result = await self.session.execute(
             text("""
                 SELECT f2.friend_id
@@ -25,3 +34,39 @@ class GraphService:
             {"uid": user_id}
         )
         return [r[0] for r in result]
+
+    async def get_mutual_friends(self, user_id: int, other_id: int):
+        if self.graph.ready:
+            return self.graph.mutual_friends(user_id, other_id)
+
+        result = await self.session.execute(
+            text("""
+                SELECT f2.friend_id
+                FROM friendship f1
+                JOIN friendship f2 ON f1.friend_id = f2.friend_id
+                WHERE f1.user_id = :uid AND f2.user_id = :other
+            """),
+            {"uid": user_id, "other": other_id}
+        )
+        return [r[0] for r in result]
+
+    async def count_mutual_friends(self, user_id: int, others):
+        others = list(others)
+        if not others:
+            return {}
+        if self.graph.ready:
+            return self.graph.count_mutual_friends(user_id, others)
+
+        result = await self.session.execute(
+            text("""
+                SELECT f2.user_id, COUNT(*)
+                FROM friendship f1
+                JOIN friendship f2 ON f1.friend_id = f2.friend_id
+                WHERE f1.user_id = :uid AND f2.user_id = ANY(:others)
+                GROUP BY f2.user_id
+            """),
+            {"uid": user_id, "others": others}
+        )
+        counts = dict.fromkeys(others, 0)
+        counts.update({uid: count for uid, count in result})
+        return counts
@@ -1,11 +1,33 @@
 from collections import Counter
 from sqlalchemy import text
 
+from ...config import RECOMMENDATION_SQL_AGGREGATION
+
 class LikeRecommendationService:
-    def __init__(self, session):
+    def __init__(self, session, aggregate_in_sql=RECOMMENDATION_SQL_AGGREGATION):
         self.session = session
+        self.aggregate_in_sql = aggregate_in_sql
 
     async def recommend_by_likes(self, user_id, top_n=15):
+        if not self.aggregate_in_sql:
+            return await self._recommend_in_python(user_id, top_n)
+
+        # Пользователи, лайкнувшие те же посты; score = число общих лайков
+        result = await self.session.execute(
+            text("""
+                SELECT other.user_id, COUNT(*) AS score
+                FROM likes mine
+                JOIN likes other ON other.post_id = mine.post_id
+                WHERE mine.user_id = :uid AND other.user_id != :uid
+                GROUP BY other.user_id
+                ORDER BY score DESC, other.user_id
+                LIMIT :top_n
+            """),
+            {"uid": user_id, "top_n": top_n}
+        )
+        return [(uid, score) for uid, score in result]
+
+    async def _recommend_in_python(self, user_id, top_n):
         # 1. Берём все посты, которые лайкнул пользователь
         result = await self.session.execute(
             text("SELECT post_id FROM likes WHERE user_id = :uid"),
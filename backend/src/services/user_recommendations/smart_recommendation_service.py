@@ -1,31 +1,56 @@
-from backend.src.services.user_recommendations.combined_user_service import CombinedUserRecommendationService
-from backend.src.services.user_recommendations.graph_user_service import GraphService
-from backend.src.services.user_recommendations.like_user_service import LikeRecommendationService
-from backend.src.services.user_recommendations.recommendation_user_service import RecommendationService
-from backend.src.services.user_recommendations.smart_user_selector import SmartUserSelector
-from backend.src.services.user_recommendations.tag_user_service import TagUserRecommendationService
+from .combined_user_service import CombinedUserRecommendationService
+from .graph_user_service import GraphService
+from .like_user_service import LikeRecommendationService
+from .recommendation_user_service import RecommendationService
+from .smart_user_selector import SmartUserSelector
+from .tag_user_service import TagUserRecommendationService
+from ..recommendation_cache import recommendation_cache
+from ..precomputed_recommendations import USERS, get_precomputed
 
 
 class SmartRecommendationService:
-    def __init__(self, session):
+    def __init__(self, session, cache=recommendation_cache):
         self.session = session
+        self.cache = cache
         self.graph_service = GraphService(session)
         self.friend_service = RecommendationService(self.graph_service)
-        # self.like_service = LikeRecommendationService(session)
+        self.like_service = LikeRecommendationService(session)
         self.tag_service = TagUserRecommendationService(session)
-        self.combined_service = CombinedUserRecommendationService(session)
 
     async def get_top(self, user_id: int, top_n: int = 15):
-        friends = [uid for uid, _ in await self.friend_service.recommend(user_id)]
-        # likes = [uid for uid, _ in await self.like_service.recommend_by_likes(user_id)]
-        tags = [uid for uid, _ in await self.tag_service.recommend_by_tags(user_id)]
-        combined_with_scores = await self.combined_service.recommend_users(user_id)
+        cached = self.cache.get(user_id, ("users", top_n))
+        if cached is not None:
+            return cached
+
+        # Результат ночного пересчёта (precompute.py), если он есть
+        precomputed = await get_precomputed(self.session, user_id, USERS)
+        if precomputed:
+            top = precomputed[:top_n]
+            self.cache.set(user_id, ("users", top_n), top)
+            return top
+
+        # Каждый источник опрашивается один раз, комбинированный список строится из тех же оценок
+        friends_scores = await self.friend_service.recommend(user_id)
+        likes_scores = await self.like_service.recommend_by_likes(user_id)
+        tags_scores = await self.tag_service.recommend_by_tags(user_id)
+        combined_with_scores = CombinedUserRecommendationService.combine(
+            friends_scores,
+            likes_scores,
+            tags_scores
+        )
+
+        friends = [uid for uid, _ in friends_scores]
+        likes = [uid for uid, _ in likes_scores]
+        tags = [uid for uid, _ in tags_scores]
         combined = [uid for uid, _ in combined_with_scores]
 
-        return SmartUserSelector.pick_top(
+        top = SmartUserSelector.pick_top(
             friends=friends,
-            # likes=likes,
+            likes=likes,
             tags=tags,
             combined=combined,
             top_n=top_n
         )
+        self.cache.set(user_id, ("users", top_n), top)
+
+        return top
@@ -1,11 +1,38 @@
 from collections import Counter
 from sqlalchemy import text
 
+from ...config import RECOMMENDATION_SQL_AGGREGATION
+
 class TagUserRecommendationService:
-    def __init__(self, session):
+    def __init__(self, session, aggregate_in_sql=RECOMMENDATION_SQL_AGGREGATION):
         self.session = session
+        self.aggregate_in_sql = aggregate_in_sql
 
     async def recommend_by_tags(self, user_id, top_n=15):
+        if not self.aggregate_in_sql:
+            return await self._recommend_in_python(user_id, top_n)
+
+        # Пользователи, лайкавшие посты с теми же тегами; score = число таких лайков по тегам
+        result = await self.session.execute(
+            text("""
+                SELECT l.user_id, COUNT(*) AS score
+                FROM likes l
+                JOIN post_tags pt ON l.post_id = pt.post_id
+                WHERE pt.tag_id IN (
+                    SELECT lpt.tag_id
+                    FROM likes mine
+                    JOIN post_tags lpt ON mine.post_id = lpt.post_id
+                    WHERE mine.user_id = :uid
+                ) AND l.user_id != :uid
+                GROUP BY l.user_id
+                ORDER BY score DESC, l.user_id
+                LIMIT :top_n
+            """),
+            {"uid": user_id, "top_n": top_n}
+        )
+        return [(uid, score) for uid, score in result]
+
+    async def _recommend_in_python(self, user_id, top_n):
         # Берём теги постов, которые лайкнул пользователь
         result = await self.session.execute(
             text("""
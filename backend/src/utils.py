@@ -1,13 +1,24 @@
+import asyncio
+import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from passlib.context import CryptContext
 
 import jwt
 
+from .cache import LRUCache
+from .config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, TOKEN_CACHE_SIZE
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
+# sha256(token) -> payload, запись живёт до exp токена
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -16,11 +27,72 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, "secret_key", "HS256")
 
 
+def decode_token(token: str):
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, "secret_key", algorithms=["HS256"])
+        if "exp" in payload:
+            token_cache.set(key, payload, expires_at=payload["exp"])
+    return dict(payload)
+
+
 def verify_token(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, "secret_key", algorithms=["HS256"])
+        payload = decode_token(token)
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+
+def encode_cursor(value: int) -> str:
+    return base64.urlsafe_b64encode(str(value).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PasswordHasher:
+    """
+    Выполняет bcrypt в отдельном пуле потоков, чтобы не блокировать event loop.
+    Число одновременных хэширований ограничено размером пула, а очередь
+    ожидающих задач — max_queue: сверх неё запрос получает 503.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+
+    @property
+    def queue_depth(self):
+        return max(self.in_flight - self.max_workers, 0)
+
+    async def _run(self, fn, *args):
+        if self.queue_depth >= self.max_queue:
+            raise HTTPException(status_code=503, detail="Too many authentication requests, try again later")
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str):
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str):
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
@@ -0,0 +1,44 @@
+from src import cache
+from src.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_expired_entry_is_dropped(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    lru = LRUCache(maxsize=10)
+    lru.set("fresh", 1, expires_at=now + 10)
+    lru.set("forever", 2)
+    lru.set("stale", 3, expires_at=now)
+
+    assert lru.get("stale", "missing") == "missing"
+    assert "stale" not in lru._data
+    assert lru.get("fresh") == 1
+
+    now += 10
+    assert lru.get("fresh") is None
+    assert lru.get("forever") == 2
+    assert (lru.hits, lru.misses) == (2, 2)
+
+
+def test_pop_and_clear():
+    lru = LRUCache(maxsize=10)
+    lru.set("a", 1)
+
+    assert lru.pop("a") == 1
+    assert lru.pop("a") is None
+    lru.set("b", 2)
+    lru.clear()
+    assert len(lru) == 0
@@ -0,0 +1,111 @@
+import asyncio
+from collections import Counter
+
+from src.services.post_recommendations.co_like_index import CoLikeIndex
+
+
+class LikesSession:
+    """
+    Отвечает на два запроса индекса по множеству пар (user_id, post_id) в памяти:
+    полное перестроение и лайки пачки пользователей.
+    before_rebuild вызывается посреди запроса перестроения, как лайки, пришедшие во время него.
+    """
+
+    def __init__(self, likes, before_rebuild=None):
+        self.likes = set(likes)
+        self.before_rebuild = before_rebuild
+
+    async def execute(self, statement, params=None):
+        if "ANY(:uids)" in str(statement):
+            uids = set(params["uids"])
+            return [(uid, pid) for uid, pid in self.likes if uid in uids]
+
+        snapshot = set(self.likes)
+        if self.before_rebuild:
+            await self.before_rebuild()
+        return co_like_rows(snapshot)
+
+
+def co_like_rows(likes):
+    posts_by_user = {}
+    for uid, pid in likes:
+        posts_by_user.setdefault(uid, set()).add(pid)
+
+    scores = Counter()
+    for posts in posts_by_user.values():
+        for a in posts:
+            for b in posts:
+                if a != b:
+                    scores[a, b] += 1
+    return [(a, b, score) for (a, b), score in scores.items()]
+
+
+def index_state(index):
+    return {post_id: dict(neighbors) for post_id, neighbors in index._index.items() if neighbors}
+
+
+async def rebuilt(likes):
+    index = CoLikeIndex(neighbors=50)
+    await index.rebuild(LikesSession(likes))
+    return index
+
+
+async def apply_batch(index, session, added, removed):
+    session.likes |= set(added)
+    session.likes -= set(removed)
+    await index.on_likes_changed(session, added, removed)
+
+
+INITIAL = {(1, 10), (1, 11), (2, 10), (2, 12), (3, 11), (3, 12), (3, 13)}
+ADDED = [(1, 12), (2, 13), (4, 10), (4, 11)]
+REMOVED = [(3, 11), (2, 10)]
+
+
+def test_incremental_updates_match_full_rebuild():
+    async def run():
+        index = await rebuilt(INITIAL)
+        session = LikesSession(INITIAL)
+        await apply_batch(index, session, ADDED, REMOVED)
+
+        expected = await rebuilt(session.likes)
+        assert index_state(index) == index_state(expected)
+
+    asyncio.run(run())
+
+
+def test_likes_during_rebuild_are_replayed():
+    async def run():
+        index = CoLikeIndex(neighbors=50)
+        live = LikesSession(INITIAL)
+
+        async def concurrent_batch():
+            await apply_batch(index, live, ADDED, REMOVED)
+
+        await index.rebuild(LikesSession(INITIAL, before_rebuild=concurrent_batch))
+
+        expected = await rebuilt(live.likes)
+        assert index.ready
+        assert index_state(index) == index_state(expected)
+
+    asyncio.run(run())
+
+
+def test_updates_before_rebuild_are_ignored():
+    async def run():
+        index = CoLikeIndex(neighbors=50)
+        await apply_batch(index, LikesSession(INITIAL), ADDED, REMOVED)
+        assert not index.ready
+        assert index_state(index) == {}
+
+    asyncio.run(run())
+
+
+def test_neighbors_of_returns_top_by_score():
+    async def run():
+        index = CoLikeIndex(neighbors=1)
+        index._index = {10: {11: 3, 12: 5}}
+        index.ready = True
+        assert index.neighbors_of(10) == [(12, 5)]
+        assert index.neighbors_of(99) == []
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+from src.services.user_recommendations.friendship_graph import FriendshipGraph
+
+
+EDGES = [(1, 2), (1, 3), (2, 1), (2, 4), (3, 1), (4, 2)]
+
+
+def make_graph(compact_threshold=100):
+    graph = FriendshipGraph(compact_threshold)
+    graph._build(EDGES)
+    graph.ready = True
+    return graph
+
+
+def adjacency(graph, users):
+    return {user_id: sorted(graph.friends(user_id)) for user_id in users}
+
+
+def test_overlay_add_and_remove():
+    graph = make_graph()
+    graph.add(1, 4)
+    graph.add(5, 1)
+    graph.remove(1, 2)
+
+    assert sorted(graph.friends(1)) == [3, 4]
+    assert graph.friends(5) == [1]
+    assert graph._pending == 3
+
+
+def test_remove_then_add_restores_base_edge():
+    graph = make_graph()
+    graph.remove(1, 2)
+    graph.add(1, 2)
+
+    assert sorted(graph.friends(1)) == [2, 3]
+    assert not graph._removed.get(1)
+    assert not graph._added.get(1)
+
+
+def test_add_then_remove_leaves_no_trace():
+    graph = make_graph()
+    graph.add(3, 4)
+    graph.remove(3, 4)
+
+    assert graph.friends(3) == [1]
+    assert not graph._added.get(3)
+
+
+def test_compact_keeps_friends_and_clears_overlay():
+    graph = make_graph()
+    graph.add(1, 4)
+    graph.add(5, 1)
+    graph.remove(2, 1)
+    before = adjacency(graph, range(1, 6))
+
+    graph.compact()
+
+    assert adjacency(graph, range(1, 6)) == before
+    assert graph._added == {} and graph._removed == {} and graph._pending == 0
+    # В массивах друзья лежат отсортированными, иначе бинарный поиск в _in_base не работает
+    assert graph.friends(1) == [2, 3, 4]
+
+
+def test_compact_after_threshold():
+    graph = make_graph(compact_threshold=2)
+    graph.add(3, 4)
+    assert graph._pending == 1
+    graph.add(4, 3)
+
+    assert graph._pending == 0
+    assert graph.friends(3) == [1, 4]
+    assert graph.friends(4) == [2, 3]
+
+
+def test_friends_of_friends_and_mutual():
+    graph = make_graph()
+
+    assert sorted(graph.friends_of_friends(1)) == [4]
+    assert graph.mutual_friends(1, 4) == [2]
+    assert graph.count_mutual_friends(1, [4, 3]) == {4: 1, 3: 0}
@@ -0,0 +1,37 @@
+from starlette.requests import Request
+
+from src.http_cache import is_not_modified, make_etag
+
+
+def request_with(if_none_match=None):
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+ETAG = make_etag("friends", 1, (2, "abc", 0))
+
+
+def test_make_etag_is_weak_and_depends_on_parts():
+    assert ETAG.startswith('W/"')
+    assert ETAG == make_etag("friends", 1, (2, "abc", 0))
+    assert ETAG != make_etag("friends", 1, (2, "abc", 1))
+
+
+def test_missing_header_is_modified():
+    assert not is_not_modified(request_with(), ETAG)
+    assert not is_not_modified(request_with(""), ETAG)
+
+
+def test_matching_etag():
+    assert is_not_modified(request_with(ETAG), ETAG)
+    # Слабое сравнение: префикс W/ не учитывается
+    assert is_not_modified(request_with(ETAG.removeprefix("W/")), ETAG)
+
+
+def test_etag_in_list_and_wildcard():
+    assert is_not_modified(request_with(f'"other", {ETAG} , W/"more"'), ETAG)
+    assert is_not_modified(request_with(" * "), ETAG)
+
+
+def test_other_etag_is_modified():
+    assert not is_not_modified(request_with(make_etag("friends", 2, None)), ETAG)
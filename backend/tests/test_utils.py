@@ -0,0 +1,20 @@
+import pytest
+from fastapi import HTTPException
+
+from src.utils import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("value", [0, 1, 19, 123456789, 2**40])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor(value)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == value
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(12) + "!", "YWJj"])
+def test_invalid_cursor_is_bad_request(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+
+    assert exc.value.status_code == 400
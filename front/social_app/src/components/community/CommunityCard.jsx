@@ -10,7 +10,7 @@ import {
 } from '@mui/material'
 import { DEFAULT_AVATAR_URL } from '../../config/api'
 
-function CommunityCard({ community, isSubscribed, onSubscribe, onUnsubscribe, onPostCreated, onSendComment }) {
+function CommunityCard({ community, isSubscribed, onSubscribe, onUnsubscribe, onPostCreated, onSendComment, onLoadMoreComments, onLoadMore }) {
   const [modalOpen, setModalOpen] = useState(false)
   
   if (!community) return null
@@ -27,6 +27,13 @@ function CommunityCard({ community, isSubscribed, onSubscribe, onUnsubscribe, on
 
   const communityId = id || community_id
 
+  // Пока комментарии не дочитывались, о продолжении говорит счётчик, потом — курсор ответа
+  const hasMoreComments = (post) => (
+    post.comments_next_before !== undefined
+      ? post.comments_next_before != null
+      : (post.comments_count || 0) > (post.comments || []).length
+  )
+
   const handlePostCreated = async () => {
     if (onPostCreated) {
       await onPostCreated()
@@ -110,9 +117,19 @@ function CommunityCard({ community, isSubscribed, onSubscribe, onUnsubscribe, on
                   comments={post.comments || []}
                   onLike={() => console.log('Лайк поста:', post.post_id)}
                   onSendComment={comment => onSendComment?.(post.post_id, comment)}
+                  onLoadMoreComments={
+                    onLoadMoreComments && hasMoreComments(post)
+                      ? () => onLoadMoreComments(post.post_id)
+                      : null
+                  }
                   sx={{ mb: 2 }}
                 />
               ))}
+              {onLoadMore && (
+                <Button variant="outlined" onClick={onLoadMore} sx={{ mt: 1 }}>
+                  Показать ещё
+                </Button>
+              )}
             </Box>
           )}
         </Grid>
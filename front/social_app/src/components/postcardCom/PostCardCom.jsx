@@ -19,6 +19,7 @@ function PostCardCom({
   comments = [],
   onLike, 
   onSendComment,
+  onLoadMoreComments,
   ...props
 }) {
   const [comment, setComment] = useState('')
@@ -132,6 +133,12 @@ function PostCardCom({
               ))}
             </Box>
           )}
+
+          {onLoadMoreComments && (
+            <Button size="small" onClick={onLoadMoreComments} sx={{ mb: 1 }}>
+              {comments && comments.length > 0 ? 'Показать ещё комментарии' : 'Показать комментарии'}
+            </Button>
+          )}
         </Box>
 
         {/* Комментарии и лайк */}
@@ -72,6 +72,42 @@ export default function CommunityPage() {
     }
   }
 
+  const handleLoadMore = async () => {
+    try {
+      const data = await makeRequest(`communities/${communityId}?after=${communityData.next_cursor}`)
+      setCommunityData(prev => ({
+        ...prev,
+        posts: [...prev.posts, ...data.posts],
+        next_cursor: data.next_cursor
+      }))
+    } catch (err) {
+      console.error('Ошибка загрузки постов:', err)
+    }
+  }
+
+  // Превью содержит только последние комментарии, остальные дочитываются страницами от новых к старым.
+  // Курсор хранится в самом посте, поэтому после перезагрузки сообщества он сбрасывается вместе с превью
+  const handleLoadMoreComments = async (postId) => {
+    const post = communityData.posts.find(p => p.post_id === postId)
+    if (!post) return
+
+    const comments = post.comments || []
+    const before = post.comments_next_before ?? comments[comments.length - 1]?.comment_id
+    try {
+      const page = await makeRequest(`posts/${postId}/comments${before ? `?before=${before}` : ''}`)
+      setCommunityData(prev => ({
+        ...prev,
+        posts: prev.posts.map(p => (
+          p.post_id === postId
+            ? { ...p, comments: [...(p.comments || []), ...page.items], comments_next_before: page.next_before }
+            : p
+        ))
+      }))
+    } catch (err) {
+      console.error('Ошибка загрузки комментариев:', err)
+    }
+  }
+
   const handleSendComment = async (postId, comment) => {
     if (!comment || !comment.trim()) {
       return
@@ -117,6 +153,8 @@ export default function CommunityPage() {
           onUnsubscribe={handleUnsubscribe}
           onPostCreated={handlePostCreated}
           onSendComment={handleSendComment}
+          onLoadMoreComments={handleLoadMoreComments}
+          onLoadMore={communityData?.next_cursor ? handleLoadMore : null}
         />
       </div>
     </div>
@@ -8,11 +8,13 @@ import './Feed.css'
 function Feed() {
   const { makeRequest } = useApi()
   const [posts, setPosts] = useState([]) 
+  const [nextCursor, setNextCursor] = useState(null)
   const [commentsByPost, setCommentsByPost] = useState({})
 
-  const fetchPosts = async () => {
+  const fetchPosts = async (cursor = null) => {
     try {
-      const data = await makeRequest('posts') 
+      const page = await makeRequest(cursor ? `posts?after=${cursor}` : 'posts')
+      const data = page.items
       console.log('Получены посты:', data)
       // Проверяем структуру данных
       if (data && Array.isArray(data)) {
@@ -24,14 +26,18 @@ function Feed() {
           })
         })
       }
-      setPosts(data) 
+      setPosts(prev => (cursor ? [...prev, ...data] : data))
+      setNextCursor(page.next_cursor)
 
-      // Загружаем комментарии для каждого поста
+      // Загружаем первую страницу комментариев только для постов, где они есть
       if (data && Array.isArray(data)) {
         const commentsPromises = data.map(async (post) => {
+          if (!post.comments_count) {
+            return { postId: post.post_id, comments: [] }
+          }
           try {
-            const comments = await makeRequest(`posts/${post.post_id}/comments`)
-            return { postId: post.post_id, comments }
+            const page = await makeRequest(`posts/${post.post_id}/comments`)
+            return { postId: post.post_id, comments: page.items }
           } catch (error) {
             console.error(`Ошибка при загрузке комментариев для поста ${post.post_id}:`, error)
             return { postId: post.post_id, comments: [] }
@@ -43,7 +49,7 @@ function Feed() {
         commentsResults.forEach(({ postId, comments }) => {
           commentsMap[postId] = comments
         })
-        setCommentsByPost(commentsMap)
+        setCommentsByPost(prev => (cursor ? { ...prev, ...commentsMap } : commentsMap))
       }
     } catch (error) {
       console.error('Ошибка при получении постов:', error)
@@ -54,9 +60,12 @@ function Feed() {
     fetchPosts()
   }, []) 
 
-  // Заглушки для обработки лайка и комментария
-  const handleLike = id => {
-    alert(`Лайк, пост: ${id}`)
+  const handleLike = async id => {
+    try {
+      await makeRequest(`posts/${id}/like`, { method: 'POST' })
+    } catch (error) {
+      console.error('Ошибка при лайке:', error)
+    }
   }
 
   const handleSendComment = async (postId, comment) => {
@@ -77,7 +86,7 @@ function Feed() {
       const updatedComments = await makeRequest(`posts/${postId}/comments`)
       setCommentsByPost(prev => ({
         ...prev,
-        [postId]: updatedComments
+        [postId]: updatedComments.items
       }))
     } catch (error) {
       console.error('Ошибка при отправке комментария:', error)
@@ -91,7 +100,7 @@ function Feed() {
       <div className="feed-container">
         <div className="feed-left">
           <h1 className="feed-title">Мои Новости</h1>
-          <Sidebar onPostCreated={fetchPosts} />
+          <Sidebar onPostCreated={() => fetchPosts()} />
         </div>
         {/* <div className="feed-logo">SPRING</div> */}
         <h3 className="feed-logo">SPRING</h3>
@@ -102,6 +111,11 @@ function Feed() {
             onLike={handleLike}
             onSendComment={handleSendComment}
           />
+          {nextCursor && (
+            <button className="feed-load-more" onClick={() => fetchPosts(nextCursor)}>
+              Показать ещё
+            </button>
+          )}
         </div>
       </div>
     </div>